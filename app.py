@@ -4,21 +4,27 @@ CSRD Data Extraction Engine - FastAPI Web Application
 Professional UI for monitoring extraction progress and viewing statistics.
 """
 import asyncio
-import json
-import subprocess
+import hashlib
+import logging
+import itertools
+import re
 import sys
+import threading
 import os
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 from contextlib import asynccontextmanager
-import threading
-import queue
+from concurrent.futures import ThreadPoolExecutor
 import traceback
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+import orjson
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.middleware.gzip import GZipMiddleware
+import pandas as pd
 import uvicorn
 
 # Add project root to path
@@ -31,6 +37,16 @@ from src.database_handler import DatabaseHandler
 # Global State
 # ============================================================================
 
+LOG_QUEUE_MAXSIZE = 1024  # Producer thread blocks when the consumer falls behind
+LOG_PUT_BATCH = 32  # Log lines the producer thread hands over per queue put
+LOG_BATCH_SIZE = 64  # Max log lines coalesced into one WebSocket frame
+LOG_BATCH_WAIT = 0.05  # Seconds a partial batch may wait for more lines
+LOG_HISTORY_SIZE = 2000  # Oldest log lines are evicted past this point
+LOG_REPLAY_SIZE = 500  # Log lines replayed to a newly connected client
+HEARTBEAT_INTERVAL = 30.0  # Seconds between app-level pings to prune dead clients
+PROGRESS_INTERVAL = 1 / 30  # Progress frames are coalesced to at most ~30 Hz
+
+
 class ExtractionState:
     """Manages extraction state and WebSocket connections."""
     
@@ -40,35 +56,173 @@ class ExtractionState:
         self.current_indicator = None
         self.progress = 0
         self.total_indicators = 60  # 20 per bank * 3 banks
-        self.logs: List[str] = []
+        self.logs: deque = deque(maxlen=LOG_HISTORY_SIZE)
         self.results: Dict[str, Any] = {}
-        self.connections: List[WebSocket] = []
-        self.log_queue = queue.Queue()
-        
+        self.connections: Set[WebSocket] = set()
+        self.log_queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.task: Optional[asyncio.Task] = None
+        self._pending_progress: Optional[dict] = None
+        self._pending_lines: List[str] = []
+        self._emit_lock = threading.Lock()
+        self._progress_ready = asyncio.Event()
+    
+    def _put_from_thread(self, item: tuple):
+        # Callers hold _emit_lock, so puts reach the loop in emit order
+        return asyncio.run_coroutine_threadsafe(self.log_queue.put(item), self.loop)
+    
+    def _flush_lines_locked(self) -> list:
+        if not self._pending_lines:
+            return []
+        lines, self._pending_lines = self._pending_lines, []
+        return [self._put_from_thread(("log", lines))]
+    
+    def flush_lines_from_thread(self) -> None:
+        """Hand any buffered log lines to the event loop."""
+        with self._emit_lock:
+            futures = self._flush_lines_locked()
+        for future in futures:
+            future.result()
+    
+    def log_from_thread(self, text: str) -> None:
+        """Buffer a log line from a worker thread; lines are queued in batches.
+        
+        A batch is handed over when it fills, before the next non-log event,
+        or LOG_BATCH_WAIT after its first line, whichever comes first.
+        """
+        with self._emit_lock:
+            self._pending_lines.append(text)
+            if len(self._pending_lines) < LOG_PUT_BATCH:
+                if len(self._pending_lines) == 1:
+                    timer = threading.Timer(LOG_BATCH_WAIT, self.flush_lines_from_thread)
+                    timer.daemon = True
+                    timer.start()
+                return
+            futures = self._flush_lines_locked()
+        for future in futures:
+            future.result()
+    
+    def emit_from_thread(self, msg_type: str, data: Any = None) -> None:
+        """Hand an event from a worker thread to the event loop's queue.
+        
+        Buffered log lines go first so the console stays in order. Blocks the
+        calling thread while the queue is full, so a slow consumer throttles
+        the pipeline instead of dropping events.
+        """
+        with self._emit_lock:
+            futures = self._flush_lines_locked()
+            futures.append(self._put_from_thread((msg_type, data)))
+        for future in futures:
+            future.result()
+    
+    async def broadcast_logs(self, entries: List[dict]):
+        """Record log entries in the history and send them as one frame."""
+        self.logs.extend(entries)
+        await self.broadcast({"type": "log_batch", "entries": entries})
+    
+    def set_progress(self, message: dict) -> None:
+        """Record the latest progress frame; only the newest one gets sent."""
+        self._pending_progress = message
+        self._progress_ready.set()
+    
+    async def flush_progress(self):
+        """Send the pending progress frame, if any."""
+        message, self._pending_progress = self._pending_progress, None
+        if message is not None:
+            await self.broadcast(message)
+    
+    def log_tail(self) -> List[dict]:
+        """Most recent log entries, bounded for replay to new clients."""
+        start = max(0, len(self.logs) - LOG_REPLAY_SIZE)
+        return list(itertools.islice(self.logs, start, None))
+    
     async def broadcast(self, message: dict):
-        """Broadcast message to all connected WebSocket clients."""
-        disconnected = []
-        for ws in self.connections:
-            try:
-                await ws.send_json(message)
-            except:
-                disconnected.append(ws)
-        for ws in disconnected:
-            self.connections.remove(ws)
+        """Broadcast message to all connected WebSocket clients concurrently."""
+        # Encode once and hand the same bytes to every socket (binary frame,
+        # so there is no per-client str -> UTF-8 re-encode either)
+        frame = orjson.dumps(message)
+        # Snapshot so clients connecting mid-send don't shift the result order
+        connections = list(self.connections)
+        results = await asyncio.gather(
+            *(ws.send_bytes(frame) for ws in connections),
+            return_exceptions=True,
+        )
+        self.connections.difference_update(
+            ws for ws, result in zip(connections, results)
+            if isinstance(result, Exception)
+        )
+
+
+def classify_log_level(text: str) -> str:
+    """Map an extractor log line to a dashboard console style."""
+    if "[OK]" in text:
+        return "success"
+    if "Not found" in text or "failed" in text.lower():
+        return "error"
+    if "PROCESSING:" in text:
+        return "highlight"
+    return ""
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson's C encoder."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+class LineForwardingHandler(logging.Handler):
+    """Logging handler that passes each non-empty message line to a callback."""
+    
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        for line in record.getMessage().splitlines():
+            text = line.strip()
+            if text:
+                self.callback(text)
 
 
 state = ExtractionState()
 
+# The pipeline gets its own thread rather than borrowing the loop's default
+# executor; one worker, since only one extraction may run at a time
+extraction_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="extraction")
+
 
 # ============================================================================
 # FastAPI Application
 # ============================================================================
 
+async def heartbeat():
+    """Ping clients periodically so half-open sockets are pruned by broadcast()."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        if state.connections:
+            await state.broadcast({"type": "heartbeat"})
+
+
+async def progress_flusher():
+    """Send coalesced progress frames, sleeping between sends to cap the rate."""
+    while True:
+        await state._progress_ready.wait()
+        state._progress_ready.clear()
+        await state.flush_progress()
+        await asyncio.sleep(PROGRESS_INTERVAL)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     print("🚀 CSRD Extraction Engine starting...")
+    state.loop = asyncio.get_running_loop()
+    heartbeat_task = asyncio.create_task(heartbeat())
+    progress_task = asyncio.create_task(progress_flusher())
     yield
+    heartbeat_task.cancel()
+    progress_task.cancel()
     print("👋 Shutting down...")
 
 
@@ -76,9 +230,19 @@ app = FastAPI(
     title="CSRD Extraction Engine",
     description="AI-powered ESG data extraction from CSRD reports",
     version="3.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# HTML, CSS/JS and JSON responses are highly compressible text
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Dashboard CSS/JS live in static/ so browsers can cache them independently
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Written by run_extraction_v3; read by /api/stats and /api/download
+CSV_PATH = Path(settings.data_output_dir) / "extracted_indicators_v3.csv"
+
 
 # ============================================================================
 # HTML Template - Professional Minimalistic UI
@@ -92,418 +256,7 @@ HTML_TEMPLATE = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>CSRD Extraction Engine</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --bg-primary: #0a0a0b;
-            --bg-secondary: #111113;
-            --bg-tertiary: #1a1a1d;
-            --bg-card: #16161a;
-            --text-primary: #ffffff;
-            --text-secondary: #a1a1aa;
-            --text-muted: #71717a;
-            --accent: #3b82f6;
-            --accent-hover: #2563eb;
-            --success: #22c55e;
-            --warning: #f59e0b;
-            --error: #ef4444;
-            --border: #27272a;
-            --shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.3);
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-            background: var(--bg-primary);
-            color: var(--text-primary);
-            min-height: 100vh;
-            line-height: 1.6;
-        }
-        
-        /* Header */
-        header {
-            background: var(--bg-secondary);
-            border-bottom: 1px solid var(--border);
-            padding: 1.5rem 2rem;
-            position: sticky;
-            top: 0;
-            z-index: 100;
-        }
-        
-        .header-content {
-            max-width: 1400px;
-            margin: 0 auto;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        
-        .logo {
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-        }
-        
-        .logo-icon {
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--accent), #8b5cf6);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.25rem;
-        }
-        
-        .logo h1 {
-            font-size: 1.25rem;
-            font-weight: 600;
-            letter-spacing: -0.5px;
-        }
-        
-        .logo span {
-            color: var(--text-muted);
-            font-size: 0.75rem;
-            font-weight: 400;
-        }
-        
-        .status-badge {
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            padding: 0.5rem 1rem;
-            background: var(--bg-tertiary);
-            border-radius: 9999px;
-            font-size: 0.875rem;
-        }
-        
-        .status-dot {
-            width: 8px;
-            height: 8px;
-            border-radius: 50%;
-            background: var(--success);
-            animation: pulse 2s infinite;
-        }
-        
-        .status-dot.idle {
-            background: var(--text-muted);
-            animation: none;
-        }
-        
-        .status-dot.running {
-            background: var(--accent);
-        }
-        
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.5; }
-        }
-        
-        /* Main Content */
-        main {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 2rem;
-        }
-        
-        /* Hero Section */
-        .hero {
-            text-align: center;
-            padding: 3rem 0;
-            margin-bottom: 2rem;
-        }
-        
-        .hero h2 {
-            font-size: 2.5rem;
-            font-weight: 700;
-            letter-spacing: -1px;
-            margin-bottom: 1rem;
-            background: linear-gradient(135deg, #fff, #a1a1aa);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-        }
-        
-        .hero p {
-            color: var(--text-secondary);
-            font-size: 1.125rem;
-            max-width: 600px;
-            margin: 0 auto 2rem;
-        }
-        
-        .hero-features {
-            display: flex;
-            justify-content: center;
-            gap: 2rem;
-            flex-wrap: wrap;
-        }
-        
-        .feature {
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            color: var(--text-muted);
-            font-size: 0.875rem;
-        }
-        
-        .feature-icon {
-            width: 24px;
-            height: 24px;
-            background: var(--bg-tertiary);
-            border-radius: 6px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-        
-        /* Cards Grid */
-        .grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-            gap: 1.5rem;
-            margin-bottom: 2rem;
-        }
-        
-        .card {
-            background: var(--bg-card);
-            border: 1px solid var(--border);
-            border-radius: 16px;
-            padding: 1.5rem;
-            transition: transform 0.2s, box-shadow 0.2s;
-        }
-        
-        .card:hover {
-            transform: translateY(-2px);
-            box-shadow: var(--shadow);
-        }
-        
-        .card-header {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            margin-bottom: 1rem;
-        }
-        
-        .card-title {
-            font-size: 0.875rem;
-            color: var(--text-muted);
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }
-        
-        .card-value {
-            font-size: 2.5rem;
-            font-weight: 700;
-            letter-spacing: -1px;
-        }
-        
-        .card-value.success { color: var(--success); }
-        .card-value.warning { color: var(--warning); }
-        .card-value.accent { color: var(--accent); }
-        
-        .card-subtitle {
-            font-size: 0.875rem;
-            color: var(--text-secondary);
-            margin-top: 0.5rem;
-        }
-        
-        /* Progress Section */
-        .progress-section {
-            background: var(--bg-card);
-            border: 1px solid var(--border);
-            border-radius: 16px;
-            padding: 2rem;
-            margin-bottom: 2rem;
-        }
-        
-        .progress-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 1.5rem;
-        }
-        
-        .progress-title {
-            font-size: 1.25rem;
-            font-weight: 600;
-        }
-        
-        .progress-bar-container {
-            background: var(--bg-tertiary);
-            border-radius: 9999px;
-            height: 12px;
-            overflow: hidden;
-            margin-bottom: 1rem;
-        }
-        
-        .progress-bar {
-            background: linear-gradient(90deg, var(--accent), #8b5cf6);
-            height: 100%;
-            border-radius: 9999px;
-            transition: width 0.5s ease;
-        }
-        
-        .progress-info {
-            display: flex;
-            justify-content: space-between;
-            color: var(--text-secondary);
-            font-size: 0.875rem;
-        }
-        
-        /* Bank Cards */
-        .bank-grid {
-            display: grid;
-            grid-template-columns: repeat(3, 1fr);
-            gap: 1rem;
-            margin-top: 1.5rem;
-        }
-        
-        @media (max-width: 768px) {
-            .bank-grid {
-                grid-template-columns: 1fr;
-            }
-        }
-        
-        .bank-card {
-            background: var(--bg-tertiary);
-            border-radius: 12px;
-            padding: 1.25rem;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .bank-card.active {
-            border: 2px solid var(--accent);
-        }
-        
-        .bank-card.completed {
-            border: 2px solid var(--success);
-        }
-        
-        .bank-name {
-            font-weight: 600;
-            margin-bottom: 0.5rem;
-        }
-        
-        .bank-stats {
-            font-size: 0.875rem;
-            color: var(--text-secondary);
-        }
-        
-        .bank-accuracy {
-            font-size: 1.5rem;
-            font-weight: 700;
-            margin-top: 0.5rem;
-        }
-        
-        /* Action Button */
-        .action-btn {
-            background: linear-gradient(135deg, var(--accent), #8b5cf6);
-            color: white;
-            border: none;
-            padding: 1rem 2rem;
-            font-size: 1rem;
-            font-weight: 600;
-            border-radius: 12px;
-            cursor: pointer;
-            transition: transform 0.2s, opacity 0.2s;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }
-        
-        .action-btn:hover:not(:disabled) {
-            transform: translateY(-2px);
-        }
-        
-        .action-btn:disabled {
-            opacity: 0.5;
-            cursor: not-allowed;
-        }
-        
-        /* Log Console */
-        .console {
-            background: var(--bg-secondary);
-            border: 1px solid var(--border);
-            border-radius: 16px;
-            overflow: hidden;
-        }
-        
-        .console-header {
-            background: var(--bg-tertiary);
-            padding: 1rem 1.5rem;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            border-bottom: 1px solid var(--border);
-        }
-        
-        .console-dot {
-            width: 12px;
-            height: 12px;
-            border-radius: 50%;
-        }
-        
-        .console-dot.red { background: #ef4444; }
-        .console-dot.yellow { background: #f59e0b; }
-        .console-dot.green { background: #22c55e; }
-        
-        .console-body {
-            padding: 1.5rem;
-            height: 300px;
-            overflow-y: auto;
-            font-family: 'JetBrains Mono', 'Fira Code', monospace;
-            font-size: 0.8125rem;
-            line-height: 1.8;
-        }
-        
-        .log-entry {
-            color: var(--text-secondary);
-            padding: 0.25rem 0;
-        }
-        
-        .log-entry.success { color: var(--success); }
-        .log-entry.error { color: var(--error); }
-        .log-entry.info { color: var(--accent); }
-        .log-entry.highlight { color: var(--warning); }
-        
-        /* Footer */
-        footer {
-            text-align: center;
-            padding: 2rem;
-            color: var(--text-muted);
-            font-size: 0.875rem;
-            border-top: 1px solid var(--border);
-            margin-top: 2rem;
-        }
-        
-        /* Animations */
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        
-        .animate-in {
-            animation: fadeIn 0.5s ease forwards;
-        }
-        
-        /* Spinner */
-        .spinner {
-            width: 20px;
-            height: 20px;
-            border: 2px solid transparent;
-            border-top-color: currentColor;
-            border-radius: 50%;
-            animation: spin 1s linear infinite;
-        }
-        
-        @keyframes spin {
-            to { transform: rotate(360deg); }
-        }
-    </style>
+    <link rel="stylesheet" href="/static/app.css">
 </head>
 <body>
     <header>
@@ -630,7 +383,7 @@ HTML_TEMPLATE = """
                 <div class="console-dot red"></div>
                 <div class="console-dot yellow"></div>
                 <div class="console-dot green"></div>
-                <span style="margin-left: 0.5rem; color: var(--text-muted); font-size: 0.875rem">Extraction Logs</span>
+                <span class="console-title">Extraction Logs</span>
             </div>
             <div class="console-body" id="logConsole">
                 <div class="log-entry info">Welcome to CSRD Extraction Engine v3.0</div>
@@ -644,219 +397,98 @@ HTML_TEMPLATE = """
         CSRD Extraction Engine • Powered by Gemini 2.5 Flash • Built with FastAPI
     </footer>
     
-    <script>
-        let ws = null;
-        let isRunning = false;
-        
-        // Initialize WebSocket
-        function connectWebSocket() {
-            const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-            ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
-            
-            ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                handleMessage(data);
-            };
-            
-            ws.onclose = () => {
-                setTimeout(connectWebSocket, 3000);
-            };
-        }
-        
-        function handleMessage(data) {
-            switch(data.type) {
-                case 'status':
-                    updateStatus(data);
-                    break;
-                case 'progress':
-                    updateProgress(data);
-                    break;
-                case 'log':
-                    addLog(data.message, data.level);
-                    break;
-                case 'bank_complete':
-                    updateBankCard(data);
-                    break;
-                case 'complete':
-                    extractionComplete(data);
-                    break;
-                case 'stats':
-                    updateStats(data);
-                    break;
-            }
-        }
-        
-        function updateStatus(data) {
-            const dot = document.getElementById('statusDot');
-            const text = document.getElementById('statusText');
-            
-            dot.className = 'status-dot ' + (data.running ? 'running' : 'idle');
-            text.textContent = data.running ? 'Running' : 'Ready';
-            isRunning = data.running;
-            
-            document.getElementById('runBtn').disabled = isRunning;
-            document.getElementById('runBtn').innerHTML = isRunning 
-                ? '<div class="spinner"></div> Extracting...' 
-                : '<span>▶</span> Start Extraction';
-        }
-        
-        function updateProgress(data) {
-            const percent = Math.round((data.current / data.total) * 100);
-            document.getElementById('progressBar').style.width = percent + '%';
-            document.getElementById('progressPercent').textContent = percent + '%';
-            document.getElementById('currentTask').textContent = data.task || 'Processing...';
-            
-            // Highlight active bank
-            ['aib', 'bbva', 'bpce'].forEach(bank => {
-                const card = document.getElementById(bank + 'Card');
-                card.classList.remove('active');
-            });
-            
-            if (data.bank) {
-                const bankCard = document.getElementById(data.bank.toLowerCase() + 'Card');
-                if (bankCard) bankCard.classList.add('active');
-            }
-        }
-        
-        function addLog(message, level = 'info') {
-            const console = document.getElementById('logConsole');
-            const entry = document.createElement('div');
-            entry.className = 'log-entry ' + (level || '');
-            entry.textContent = `[${new Date().toLocaleTimeString()}] ${message}`;
-            console.appendChild(entry);
-            console.scrollTop = console.scrollHeight;
-        }
-        
-        function updateBankCard(data) {
-            const card = document.getElementById(data.bank.toLowerCase() + 'Card');
-            card.classList.remove('active');
-            card.classList.add('completed');
-            
-            document.getElementById(data.bank.toLowerCase() + 'Stats').textContent = 
-                `${data.found} / 20 indicators`;
-            document.getElementById(data.bank.toLowerCase() + 'Accuracy').textContent = 
-                `${data.accuracy}%`;
-        }
-        
-        function extractionComplete(data) {
-            isRunning = false;
-            document.getElementById('statusDot').className = 'status-dot idle';
-            document.getElementById('statusText').textContent = 'Completed';
-            document.getElementById('runBtn').disabled = false;
-            document.getElementById('runBtn').innerHTML = '<span>▶</span> Start Extraction';
-            
-            updateStats(data);
-            addLog(`✅ Extraction complete! Total: ${data.total_found}/60 (${data.accuracy}%)`, 'success');
-        }
-        
-        function updateStats(data) {
-            document.getElementById('totalFound').textContent = data.total_found || '--';
-            document.getElementById('accuracy').textContent = (data.accuracy || '--') + '%';
-            document.getElementById('highConf').textContent = data.high_conf || '--';
-            
-            if (data.last_run) {
-                document.getElementById('lastRun').textContent = data.last_run;
-            }
-            if (data.duration) {
-                document.getElementById('lastDuration').textContent = `Duration: ${data.duration}`;
-            }
-        }
-        
-        async function startExtraction() {
-            if (isRunning) return;
-            
-            // Clear console
-            const console = document.getElementById('logConsole');
-            console.innerHTML = '';
-            addLog('Starting extraction...', 'info');
-            
-            // Reset bank cards
-            ['aib', 'bbva', 'bpce'].forEach(bank => {
-                const card = document.getElementById(bank + 'Card');
-                card.classList.remove('active', 'completed');
-                document.getElementById(bank + 'Stats').textContent = '-- / 20 indicators';
-                document.getElementById(bank + 'Accuracy').textContent = '--%';
-            });
-            
-            try {
-                const response = await fetch('/api/extract', { method: 'POST' });
-                const data = await response.json();
-                
-                if (!data.success) {
-                    addLog('Error: ' + data.error, 'error');
-                }
-            } catch (error) {
-                addLog('Failed to start extraction: ' + error.message, 'error');
-            }
-        }
-        
-        // Load initial stats
-        async function loadStats() {
-            try {
-                const response = await fetch('/api/stats');
-                const data = await response.json();
-                updateStats(data);
-                
-                // Update bank cards
-                if (data.banks) {
-                    data.banks.forEach(bank => {
-                        const bankName = bank.name.toLowerCase();
-                        document.getElementById(bankName + 'Stats').textContent = 
-                            `${bank.found} / 20 indicators`;
-                        document.getElementById(bankName + 'Accuracy').textContent = 
-                            `${bank.accuracy}%`;
-                        if (bank.found > 0) {
-                            document.getElementById(bankName + 'Card').classList.add('completed');
-                        }
-                    });
-                }
-            } catch (error) {
-                console.error('Failed to load stats:', error);
-            }
-        }
-        
-        // Download CSV file
-        function downloadCSV() {
-            window.location.href = '/api/download';
-        }
-        
-        // Initialize
-        connectWebSocket();
-        loadStats();
-    </script>
+    <script src="/static/app.js" defer></script>
 </body>
 </html>
 """
 
 
+def compile_stylesheet(css: str) -> str:
+    """Inline the :root custom-property palette into every var() reference."""
+    root = re.search(r":root\s*\{(.*?)\}\s*", css, re.DOTALL)
+    if not root:
+        return css
+    palette = dict(re.findall(r"(--[\w-]+)\s*:\s*([^;]+);", root.group(1)))
+    css = css[:root.start()] + css[root.end():]
+    return re.sub(
+        r"var\((--[\w-]+)\)",
+        lambda m: palette.get(m.group(1), m.group(0)),
+        css,
+    )
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+
+def cached_response(request: Request, body: bytes, etag: str, media_type: str) -> Response:
+    """Serve a pre-encoded body, answering 304 if the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# Encode the dashboard once at import time so every GET / reuses the same bytes
+_HTML_BYTES = HTML_TEMPLATE.encode("utf-8")
+_HTML_ETAG = make_etag(_HTML_BYTES)
+
+# The dark theme palette is fixed, so resolve its custom properties up front
+_CSS_BYTES = compile_stylesheet(
+    (STATIC_DIR / "app.css").read_text(encoding="utf-8")
+).encode("utf-8")
+_CSS_ETAG = make_etag(_CSS_BYTES)
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
 
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve the main dashboard."""
-    return HTML_TEMPLATE
+async def root(request: Request):
+    """Serve the main dashboard (304 if the browser already has it)."""
+    return cached_response(request, _HTML_BYTES, _HTML_ETAG, "text/html")
+
+
+@app.get("/static/app.css")
+async def stylesheet(request: Request):
+    """Serve the dashboard stylesheet with its palette pre-resolved."""
+    return cached_response(request, _CSS_BYTES, _CSS_ETAG, "text/css")
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket for real-time updates."""
     await websocket.accept()
-    state.connections.append(websocket)
+    state.connections.add(websocket)
     
     # Send initial status
-    await websocket.send_json({
+    await websocket.send_bytes(orjson.dumps({
         "type": "status",
         "running": state.is_running
-    })
+    }))
+    
+    # Replay recent history as a single frame so reconnects see the current run
+    tail = state.log_tail()
+    if tail:
+        await websocket.send_bytes(orjson.dumps({
+            "type": "log_batch",
+            "entries": tail,
+            "replay": True
+        }))
     
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        if websocket in state.connections:
-            state.connections.remove(websocket)
+        state.connections.discard(websocket)
+
+
+# Memo of /api/stats keyed on the CSV's mtime, so the file is only re-parsed
+# after an extraction run rewrites it
+_stats_cache: Dict[str, Any] = {"mtime": None, "value": None}
+STATS_BANKS = ["aib", "bbva", "bpce"]
 
 
 @app.get("/api/stats")
@@ -864,7 +496,12 @@ async def get_stats():
     """Get extraction statistics from database and CSV."""
     try:
         # Try to read from latest CSV
-        csv_path = Path(settings.data_output_dir) / "extracted_indicators_v3.csv"
+        try:
+            mtime = CSV_PATH.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+        if mtime == _stats_cache["mtime"]:
+            return _stats_cache["value"]
         
         stats = {
             "total_found": 0,
@@ -875,25 +512,31 @@ async def get_stats():
             "banks": []
         }
         
-        if csv_path.exists():
-            import csv
-            
-            bank_data = {"aib": [], "bbva": [], "bpce": []}
+        if mtime:
+            # Columnar parse of just the three columns the stats need
+            try:
+                df = pd.read_csv(
+                    CSV_PATH,
+                    usecols=["company", "value", "confidence_score"],
+                    dtype={"company": str, "value": str, "confidence_score": float},
+                )
+            except pd.errors.EmptyDataError:
+                df = pd.DataFrame(columns=["company", "value", "confidence_score"])
             
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    bank = row.get('bank', '').lower()
-                    if bank in bank_data:
-                        bank_data[bank].append(row)
+            # "N/A" and empty cells are parsed as missing, so notna() marks a hit
+            per_bank = pd.DataFrame({
+                "rows": 1,
+                "found": df["value"].notna(),
+                "high_conf": df["confidence_score"].fillna(0) >= 0.7,
+            }).groupby(df["company"].str.lower()).sum().reindex(STATS_BANKS, fill_value=0)
             
             total_found = 0
             total_high_conf = 0
             
-            for bank_name, rows in bank_data.items():
-                found = sum(1 for r in rows if r.get('value') and r.get('value') != 'N/A')
-                high_conf = sum(1 for r in rows if float(r.get('confidence', 0) or 0) >= 0.7)
-                accuracy = round(found / 20 * 100, 1) if rows else 0
+            for bank_name, row in per_bank.iterrows():
+                found = int(row["found"])
+                high_conf = int(row["high_conf"])
+                accuracy = round(found / 20 * 100, 1) if row["rows"] else 0
                 
                 total_found += found
                 total_high_conf += high_conf
@@ -910,9 +553,10 @@ async def get_stats():
             stats["high_conf"] = total_high_conf
             
             # Get last modified time
-            mtime = csv_path.stat().st_mtime
-            stats["last_run"] = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M")
+            stats["last_run"] = datetime.fromtimestamp(mtime / 1e9).strftime("%Y-%m-%d %H:%M")
         
+        _stats_cache["mtime"] = mtime
+        _stats_cache["value"] = stats
         return stats
         
     except Exception as e:
@@ -922,13 +566,11 @@ async def get_stats():
 @app.get("/api/download")
 async def download_csv():
     """Download the extracted indicators CSV file."""
-    csv_path = Path(settings.data_output_dir) / "extracted_indicators_v3.csv"
-    
-    if not csv_path.exists():
+    if not CSV_PATH.exists():
         raise HTTPException(status_code=404, detail="CSV file not found. Run extraction first.")
     
     return FileResponse(
-        path=str(csv_path),
+        path=CSV_PATH,
         media_type="text/csv",
         filename="csrd_extracted_indicators.csv"
     )
@@ -948,157 +590,166 @@ async def start_extraction():
         "running": True
     })
     
-    # Run extraction in background
-    asyncio.create_task(run_extraction())
+    # Run extraction in background (keep a reference so the task isn't collected)
+    state.task = asyncio.create_task(run_extraction())
     
     return {"success": True, "message": "Extraction started"}
 
 
 async def run_extraction():
-    """Run the extraction script and stream progress using threading (Windows compatible)."""
+    """Run the V3 pipeline in-process on a worker thread and stream its progress."""
     
-    def run_subprocess():
-        """Run the subprocess in a separate thread."""
-        script_path = Path(__file__).parent / "run_extraction_v3.py"
-        
-        try:
-            # Use subprocess.Popen which works on Windows
-            process = subprocess.Popen(
-                [sys.executable, str(script_path)],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                cwd=str(Path(__file__).parent),
-                bufsize=1,
-                universal_newlines=True,
-                encoding='utf-8',
-                errors='ignore'
-            )
+    def run_pipeline():
+        """Run the blocking pipeline, forwarding its logs and progress events."""
+        current_bank = None
+        indicator_count = 0
+        bank_results = {}
+        
+        def handle_line(text: str) -> None:
+            # Hand logs to the event loop for async processing
+            state.log_from_thread(text)
+        
+        def handle_event(event_type: str, data: Dict[str, Any]) -> None:
+            nonlocal current_bank, indicator_count
             
-            current_bank = None
-            indicator_count = 0
-            bank_results = {}
+            if event_type == "bank_start":
+                current_bank = data["bank"]
+                state.emit_from_thread("bank_start", current_bank)
             
-            # Read output line by line
-            for line in process.stdout:
-                text = line.strip()
-                if not text:
-                    continue
-                
-                # Put logs in queue for async processing
-                state.log_queue.put(("log", text))
-                
-                # Parse log line for progress
-                if "PROCESSING:" in text:
-                    if "AIB" in text:
-                        current_bank = "AIB"
-                    elif "BBVA" in text:
-                        current_bank = "BBVA"
-                    elif "BPCE" in text:
-                        current_bank = "BPCE"
-                    state.log_queue.put(("bank_start", current_bank))
-                
-                if "Extracting" in text:
-                    indicator_count += 1
-                    indicator_name = text.split("Extracting")[-1].strip().rstrip("...")
-                    state.log_queue.put(("progress", {
-                        "current": indicator_count,
-                        "total": 60,
-                        "task": f"Extracting {indicator_name}",
-                        "bank": current_bank
-                    }))
-                
-                if "Values found:" in text and current_bank:
-                    try:
-                        parts = text.split("Values found:")[-1].strip()
-                        found_str = parts.split("/")[0].strip()
-                        found = int(found_str)
-                        accuracy = round(found / 20 * 100, 1)
-                        bank_results[current_bank] = {"found": found, "accuracy": accuracy}
-                        state.log_queue.put(("bank_complete", {
-                            "bank": current_bank,
-                            "found": found,
-                            "accuracy": accuracy
-                        }))
-                    except:
-                        pass
+            elif event_type == "indicator":
+                indicator_count += 1
+                state.emit_from_thread("progress", {
+                    "current": indicator_count,
+                    "total": 60,
+                    "task": f"Extracting {data['indicator_id']}: {data['name']}",
+                    "bank": data["bank"]
+                })
             
-            process.wait()
+            elif event_type == "bank_complete":
+                found = data["found"]
+                accuracy = round(found / 20 * 100, 1)
+                bank_results[data["bank"]] = {
+                    "found": found,
+                    "accuracy": accuracy,
+                    "high_conf": data["high_conf"]
+                }
+                state.emit_from_thread("bank_complete", {
+                    "bank": data["bank"],
+                    "found": found,
+                    "accuracy": accuracy
+                })
+        
+        # Relay the pipeline's own lines and those of the src package
+        # (database saves, LLM cache), as the old subprocess's stdout did.
+        # Levels are pinned to INFO so the console doesn't depend on how
+        # the host configured the root logger.
+        handler = LineForwardingHandler(handle_line)
+        forwarded_loggers = [logging.getLogger(name) for name in ("run_extraction_v3", "src")]
+        previous_levels = [lg.level for lg in forwarded_loggers]
+        for lg in forwarded_loggers:
+            lg.setLevel(logging.INFO)
+            lg.addHandler(handler)
+        
+        try:
+            # Heavy (LangChain / Vertex AI) - only paid once, on the first run
+            import run_extraction_v3
+            run_extraction_v3.run_extraction_v3(on_event=handle_event)
             
             # Calculate totals
-            total_found = sum(b.get("found", 0) for b in bank_results.values())
+            total_found = sum(b["found"] for b in bank_results.values())
             total_accuracy = round(total_found / 60 * 100, 1) if total_found else 0
             
-            state.log_queue.put(("complete", {
+            state.emit_from_thread("complete", {
                 "total_found": total_found,
                 "accuracy": total_accuracy,
-                "high_conf": total_found,
+                "high_conf": sum(b["high_conf"] for b in bank_results.values()),
                 "banks": [{"name": k, **v} for k, v in bank_results.items()]
-            }))
+            })
             
         except Exception as e:
-            state.log_queue.put(("error", str(e)))
+            state.emit_from_thread("error", str(e))
         finally:
-            state.log_queue.put(("done", None))
+            for lg, level in zip(forwarded_loggers, previous_levels):
+                lg.removeHandler(handler)
+                lg.setLevel(level)
+            state.emit_from_thread("done")
     
-    # Start subprocess in thread
-    await state.broadcast({
-        "type": "log",
-        "message": "Starting V3 High-Accuracy Extraction Pipeline...",
-        "level": "info"
-    })
-    await state.broadcast({
-        "type": "log",
-        "message": "Using Regex + LLM extraction with targeted context retrieval",
-        "level": "info"
-    })
+    # Announce the run before the pipeline starts logging
+    state.logs.clear()
+    await state.broadcast_logs([
+        {"message": "Starting V3 High-Accuracy Extraction Pipeline...", "level": "info"},
+        {"message": "Using Regex + LLM extraction with targeted context retrieval", "level": "info"},
+    ])
     
-    # Start the extraction thread
-    extraction_thread = threading.Thread(target=run_subprocess, daemon=True)
-    extraction_thread.start()
+    # Start the pipeline on a worker thread; the loop below consumes its events
+    loop = asyncio.get_running_loop()
+    pipeline = loop.run_in_executor(extraction_executor, run_pipeline)
     
-    # Process queue messages asynchronously
+    # Consume events as the thread hands them over; no polling needed
     try:
+        log_batch = []
+        batch_deadline = 0.0
         while True:
-            await asyncio.sleep(0.1)  # Small delay to prevent busy loop
+            # Whatever piled up while we were busy goes out as one frame, but a
+            # trickle of lines gets a short window to join it first
+            if log_batch and state.log_queue.empty():
+                delay = batch_deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                await state.broadcast_logs(log_batch)
+                log_batch = []
             
-            while not state.log_queue.empty():
-                msg_type, data = state.log_queue.get_nowait()
-                
-                if msg_type == "done":
-                    return  # Exit the function
-                elif msg_type == "error":
-                    await state.broadcast({"type": "log", "message": f"Error: {data}", "level": "error"})
-                elif msg_type == "log":
-                    log_level = ""
-                    if "[OK]" in data:
-                        log_level = "success"
-                    elif "Not found" in data or "failed" in data.lower():
-                        log_level = "error"
-                    elif "PROCESSING:" in data:
-                        log_level = "highlight"
-                    await state.broadcast({"type": "log", "message": data, "level": log_level})
-                elif msg_type == "progress":
-                    await state.broadcast({"type": "progress", **data})
-                elif msg_type == "bank_start":
-                    await state.broadcast({"type": "log", "message": f"Processing {data}...", "level": "info"})
-                elif msg_type == "bank_complete":
-                    await state.broadcast({"type": "bank_complete", **data})
-                elif msg_type == "complete":
-                    await state.broadcast({"type": "complete", **data})
-                    await state.broadcast({"type": "log", "message": f"Extraction complete! Total: {data['total_found']}/60 ({data['accuracy']}%)", "level": "success"})
-                    return
+            msg_type, data = await state.log_queue.get()
+            
+            # Coalesce consecutive log lines into a single frame
+            if msg_type == "log":
+                if not log_batch:
+                    batch_deadline = loop.time() + LOG_BATCH_WAIT
+                log_batch.extend(
+                    {"message": text, "level": classify_log_level(text)} for text in data
+                )
+                if len(log_batch) >= LOG_BATCH_SIZE:
+                    await state.broadcast_logs(log_batch)
+                    log_batch = []
+                continue
+            
+            if msg_type == "progress":
+                state.set_progress({"type": "progress", **data})
+                continue
             
-            # Check if thread is still alive
-            if not extraction_thread.is_alive():
-                break
+            # Flush pending lines and progress first so the UI stays in order
+            await state.flush_progress()
+            if log_batch:
+                await state.broadcast_logs(log_batch)
+                log_batch = []
+            
+            if msg_type == "done":
+                await pipeline
+                return  # Exit the function
+            elif msg_type == "error":
+                await state.broadcast_logs([{"message": f"Error: {data}", "level": "error"}])
+            elif msg_type == "bank_start":
+                await state.broadcast_logs([{"message": f"Processing {data}...", "level": "info"}])
+            elif msg_type == "bank_complete":
+                await state.broadcast({"type": "bank_complete", **data})
+            elif msg_type == "complete":
+                await state.broadcast({"type": "complete", **data})
+                await state.broadcast_logs([{"message": f"Extraction complete! Total: {data['total_found']}/60 ({data['accuracy']}%)", "level": "success"}])
                 
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Extraction error: {error_trace}")
-        await state.broadcast({"type": "log", "message": f"Error: {str(e)}", "level": "error"})
+        await state.broadcast_logs([{"message": f"Error: {str(e)}", "level": "error"}])
     finally:
         state.is_running = False
         await state.broadcast({"type": "status", "running": False})
+        # The run may have rewritten the CSV; let dashboards refetch /api/stats
+        await state.broadcast({"type": "stats_changed"})
+
+
+# Mounted after the routes above so /static/app.css is served compiled
+app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
 # ============================================================================
@@ -1118,6 +769,18 @@ if __name__ == "__main__":
         "app:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        # No file watcher: it adds a supervisor process and restarts would
+        # kill an in-flight extraction (use `uvicorn app:app --reload` to dev)
+        reload=False,
+        # Extraction state and the WebSocket fan-out live in this process
+        workers=1,
+        log_level="info",
+        # uvloop is not available on Windows; fall back to the stdlib loop there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        ws="websockets",
+        ws_per_message_deflate=True,
+        # Protocol-level pings detect half-open TCP connections
+        ws_ping_interval=20.0,
+        ws_ping_timeout=20.0,
     )
@@ -6,6 +6,9 @@ import logging
 from pathlib import Path
 import json
 import re
+import shutil
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 import pymupdf
 import pymupdf4llm
 
@@ -23,61 +26,74 @@ BANKS = [
     {"name": "bpce", "pdf": "bpce_2024.pdf", "year": 2024},
 ]
 
+# Patterns used in per-cell / per-page loops, compiled once
+WHITESPACE_RE = re.compile(r'\s+')
+NUMBER_RE = re.compile(r'[\d,]+\.?\d*')
 
-def extract_text_with_layout(pdf_path: Path) -> list:
+
+def page_markdown(doc: pymupdf.Document, page_index: int, hdr_info) -> str:
     """
-    Extract text from PDF with enhanced layout preservation.
+    Convert a single page to Markdown with enhanced layout preservation.
     Uses pymupdf4llm for better table structure.
-    """
-    logger.info(f"Extracting with layout: {pdf_path}")
     
-    # Use pymupdf4llm with table settings
+    Conversion errors propagate, so a failed page fails the whole document
+    instead of silently leaving a gap in full_text.md.
+    """
+    chunks = pymupdf4llm.to_markdown(
+        doc,
+        pages=[page_index],
+        hdr_info=hdr_info,
+        page_chunks=True,
+        write_images=False,
+        show_progress=False,
+        # Enhanced table detection
+        table_strategy="lines_strict",  # Better table detection
+    )
+    return chunks[0].get("text", "") if chunks else ""
+
+
+def extract_page_tables(page: pymupdf.Page) -> list:
+    """
+    Directly extract tables using pymupdf's find_tables() method.
+    Returns the page's tables as Markdown strings.
+    """
+    page_tables = []
     try:
-        md_chunks = pymupdf4llm.to_markdown(
-            str(pdf_path),
-            page_chunks=True,
-            write_images=False,
-            show_progress=True,
-            # Enhanced table detection
-            table_strategy="lines_strict",  # Better table detection
-        )
-        return md_chunks
+        tables = page.find_tables()
+        for table in tables:
+            # Convert table to markdown format
+            df_data = table.extract()
+            if df_data and len(df_data) > 0:
+                md_table = convert_to_markdown_table(df_data)
+                if md_table:
+                    page_tables.append(md_table)
     except Exception as e:
-        logger.error(f"pymupdf4llm failed: {e}")
-        return []
+        logger.debug(f"  Page {page.number + 1}: Table extraction error: {e}")
+    return page_tables
 
 
-def extract_tables_direct(pdf_path: Path) -> dict:
+def iter_pages(pdf_path: Path):
     """
-    Directly extract tables using pymupdf's find_tables() method.
-    Returns dict: page_num -> list of tables
+    Open the PDF once and yield (page_num, markdown) for each page, with the
+    directly extracted tables appended, so only one page is held at a time.
     """
-    logger.info(f"Extracting tables directly from: {pdf_path}")
-    tables_by_page = {}
-    
-    doc = pymupdf.open(pdf_path)
-    
-    for page_num, page in enumerate(doc, 1):
-        try:
-            tables = page.find_tables()
-            if tables.tables:
-                page_tables = []
-                for table in tables:
-                    # Convert table to markdown format
-                    df_data = table.extract()
-                    if df_data and len(df_data) > 0:
-                        md_table = convert_to_markdown_table(df_data)
-                        if md_table:
-                            page_tables.append(md_table)
-                
-                if page_tables:
-                    tables_by_page[page_num] = page_tables
-                    logger.info(f"  Page {page_num}: Found {len(page_tables)} tables")
-        except Exception as e:
-            logger.debug(f"  Page {page_num}: Table extraction error: {e}")
+    logger.info(f"Extracting with layout and tables: {pdf_path}")
     
-    doc.close()
-    return tables_by_page
+    with pymupdf.open(pdf_path) as doc:
+        # Header levels come from font statistics over the whole document;
+        # compute them once rather than on every per-page conversion
+        hdr_info = pymupdf4llm.IdentifyHeaders(doc)
+        
+        for page in doc:
+            page_num = page.number + 1
+            content = page_markdown(doc, page.number, hdr_info)
+            
+            tables = extract_page_tables(page)
+            if tables:
+                logger.info(f"  Page {page_num}: Found {len(tables)} tables")
+                content = append_tables(content, tables)
+            
+            yield page_num, content
 
 
 def convert_to_markdown_table(table_data: list) -> str:
@@ -96,105 +112,108 @@ def convert_to_markdown_table(table_data: list) -> str:
                 # Clean cell content
                 text = str(cell).strip()
                 text = text.replace("|", "/")  # Escape pipes
-                text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
+                text = WHITESPACE_RE.sub(' ', text)  # Normalize whitespace
                 clean_row.append(text)
         clean_data.append(clean_row)
     
     # Build markdown table
-    lines = []
-    
-    # Header row
     header = clean_data[0]
-    lines.append("| " + " | ".join(header) + " |")
+    width = len(header)
+    pad = [""] * width
     
-    # Separator
-    lines.append("| " + " | ".join(["---"] * len(header)) + " |")
+    lines = [
+        f"| {' | '.join(header)} |",  # Header row
+        "| " + " | ".join(["---"] * width) + " |",  # Separator
+    ]
     
-    # Data rows
-    for row in clean_data[1:]:
-        # Pad row if needed
-        while len(row) < len(header):
-            row.append("")
-        lines.append("| " + " | ".join(row[:len(header)]) + " |")
+    # Data rows, padded/truncated to the header width
+    lines += [f"| {' | '.join((row + pad)[:width])} |" for row in clean_data[1:]]
     
     return "\n".join(lines)
 
 
-def merge_content_with_tables(md_chunks: list, tables_by_page: dict) -> list:
-    """
-    Merge the markdown chunks with directly extracted tables.
-    Appends tables at the end of each page's content.
-    """
-    for chunk in md_chunks:
-        page_num = chunk.get("metadata", {}).get("page", 0) + 1
-        
-        if page_num in tables_by_page:
-            # Append extracted tables to the page content
-            extra_content = "\n\n**[Extracted Tables]**\n\n"
-            for i, table in enumerate(tables_by_page[page_num], 1):
-                extra_content += f"\n**Table {i}:**\n{table}\n"
-            
-            chunk["text"] = chunk.get("text", "") + extra_content
-    
-    return md_chunks
+def append_tables(content: str, tables: list) -> str:
+    """Append directly extracted tables to the end of a page's content."""
+    extra_content = "\n\n**[Extracted Tables]**\n\n"
+    for i, table in enumerate(tables, 1):
+        extra_content += f"\n**Table {i}:**\n{table}\n"
+    return content + extra_content
 
 
-def extract_numbers_from_page(pdf_path: Path, page_num: int) -> list:
+def extract_numbers_from_page(doc: pymupdf.Document, page_num: int) -> list:
     """
     Extract all numbers from a specific page using raw text extraction.
     Useful for finding data that might be in graphics.
+    
+    Takes an already open document so repeated lookups don't re-parse the PDF.
     """
-    doc = pymupdf.open(pdf_path)
     page = doc[page_num - 1]  # 0-indexed
     
     # Get raw text
     text = page.get_text("text")
     
     # Find all numbers (with optional comma/dot formatting)
-    numbers = re.findall(r'[\d,]+\.?\d*', text)
-    
-    doc.close()
-    return numbers
+    return NUMBER_RE.findall(text)
 
 
-def save_processed(bank_name: str, md_chunks: list, pdf_filename: str, year: int):
-    """Save processed content to disk."""
+def save_processed(bank_name: str, pages, pdf_filename: str, year: int) -> int:
+    """
+    Write each (page_num, content) to disk as it arrives; returns the page count.
+    
+    Pages and full_text.md are written to .partial paths and only replace the
+    previous output once the whole document has been converted, so a crash
+    midway never leaves a half-written document for the pipeline to load.
+    """
     output_dir = PROCESSED_DIR / bank_name.lower()
     output_dir.mkdir(parents=True, exist_ok=True)
     
     pages_dir = output_dir / "pages"
-    pages_dir.mkdir(exist_ok=True)
+    partial_pages_dir = output_dir / "pages.partial"
+    shutil.rmtree(partial_pages_dir, ignore_errors=True)
+    partial_pages_dir.mkdir()
     
-    # Save pages
-    full_text_parts = []
+    full_text_path = output_dir / "full_text.md"
+    partial_text_path = output_dir / "full_text.md.partial"
+    
+    total_pages = 0
     pages_with_tables = []
     
-    for chunk in md_chunks:
-        page_num = chunk.get("metadata", {}).get("page", 0) + 1
-        content = chunk.get("text", "")
-        
-        # Save page
-        page_path = pages_dir / f"page_{page_num:04d}.md"
-        with open(page_path, "w", encoding="utf-8") as f:
-            f.write(content)
-        
-        full_text_parts.append(content)
-        
-        # Check for tables
-        if "|" in content and "---" in content:
-            pages_with_tables.append(page_num)
+    # Stream pages straight into full_text.md instead of joining them at the end
+    try:
+        with open(partial_text_path, "w", encoding="utf-8") as full_text:
+            for page_num, content in pages:
+                # Save page
+                (partial_pages_dir / f"page_{page_num:04d}.md").write_text(content, encoding="utf-8")
+                
+                if total_pages:
+                    full_text.write("\n\n---PAGE BREAK---\n\n")
+                full_text.write(content)
+                total_pages += 1
+                
+                # Check for tables
+                if "|" in content and "---" in content:
+                    pages_with_tables.append(page_num)
+    except BaseException:
+        partial_text_path.unlink(missing_ok=True)
+        shutil.rmtree(partial_pages_dir, ignore_errors=True)
+        raise
     
-    # Save full text
-    full_text_path = output_dir / "full_text.md"
-    with open(full_text_path, "w", encoding="utf-8") as f:
-        f.write("\n\n---PAGE BREAK---\n\n".join(full_text_parts))
+    if not total_pages:
+        partial_text_path.unlink(missing_ok=True)
+        shutil.rmtree(partial_pages_dir, ignore_errors=True)
+        return 0
+    
+    # Swap the finished output in place of the previous one
+    shutil.rmtree(pages_dir, ignore_errors=True)
+    partial_pages_dir.replace(pages_dir)
+    partial_text_path.replace(full_text_path)
     
     # Save metadata
     metadata = {
         "filename": pdf_filename,
         "bank_name": bank_name.upper(),
         "report_year": year,
-        "total_pages": len(md_chunks),
+        "total_pages": total_pages,
         "pages_with_tables": pages_with_tables,
         "extraction_method": "enhanced_with_tables"
     }
@@ -202,8 +221,9 @@ def save_processed(bank_name: str, md_chunks: list, pdf_filename: str, year: int
     with open(metadata_path, "w", encoding="utf-8") as f:
         json.dump(metadata, f, indent=2)
     
-    logger.info(f"Saved {len(md_chunks)} pages for {bank_name}")
+    logger.info(f"Saved {total_pages} pages for {bank_name}")
     logger.info(f"  Pages with tables: {len(pages_with_tables)}")
+    return total_pages
 
 
 def process_bank(bank_info: dict):
@@ -222,40 +242,39 @@ def process_bank(bank_info: dict):
     logger.info(f"PROCESSING: {bank_name.upper()}")
     logger.info(f"{'='*60}")
     
-    # Step 1: Extract with layout
-    md_chunks = extract_text_with_layout(pdf_path)
+    # Extract layout text and tables page by page, writing each as we go
+    try:
+        total_pages = save_processed(bank_name, iter_pages(pdf_path), pdf_filename, year)
+    except Exception as e:
+        logger.error(f"Extraction failed: {e}")
+        total_pages = 0
     
-    if not md_chunks:
+    if not total_pages:
         logger.error(f"Failed to extract content from {pdf_filename}")
         return
     
-    # Step 2: Extract tables directly
-    tables_by_page = extract_tables_direct(pdf_path)
-    
-    # Step 3: Merge content
-    if tables_by_page:
-        logger.info(f"Merging {len(tables_by_page)} pages with extra tables")
-        md_chunks = merge_content_with_tables(md_chunks, tables_by_page)
-    
-    # Step 4: Save
-    save_processed(bank_name, md_chunks, pdf_filename, year)
-    
     logger.info(f"Completed: {bank_name}")
 
 
+def process_bank_safe(bank_info: dict):
+    """Run process_bank, logging failures so one bank can't take down the pool."""
+    try:
+        process_bank(bank_info)
+    except Exception as e:
+        logger.error(f"Failed to process {bank_info['name']}: {e}")
+        traceback.print_exc()
+
+
 def main():
     """Main entry point."""
     logger.info("="*60)
     logger.info("ENHANCED PDF RE-EXTRACTION")
     logger.info("="*60)
     
-    for bank in BANKS:
-        try:
-            process_bank(bank)
-        except Exception as e:
-            logger.error(f"Failed to process {bank['name']}: {e}")
-            import traceback
-            traceback.print_exc()
+    # Banks are independent and CPU-bound (Markdown conversion is pure
+    # Python), so give each one its own process
+    with ProcessPoolExecutor(max_workers=len(BANKS)) as executor:
+        list(executor.map(process_bank_safe, BANKS))
     
     logger.info("\n" + "="*60)
     logger.info("RE-EXTRACTION COMPLETE")
@@ -8,12 +8,15 @@ Key Improvements for 80%+ Accuracy:
 4. Verification pass for low-confidence values
 5. Smart page range detection for each indicator type
 """
-import json
+import csv
+import functools
+import heapq
 import re
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple
 import logging
 
 sys.path.insert(0, str(Path(__file__).parent))
@@ -21,7 +24,10 @@ sys.path.insert(0, str(Path(__file__).parent))
 from config.settings import settings
 from src.models import CSRDIndicator, BankExtractionResult
 from src.database_handler import DatabaseHandler
+from src.llm_cache import LLMCache
 
+import orjson
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_google_vertexai import ChatVertexAI
 
 logging.basicConfig(
@@ -31,6 +37,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Progress callback: on_event(event_type, data). Lets a host (the web UI)
+# follow the run without parsing log text.
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def emit(on_event: Optional[EventCallback], event_type: str, **data) -> None:
+    """Send a structured progress event to the callback, if one was given."""
+    if on_event is not None:
+        on_event(event_type, data)
+
 
 # ============================================================================
 # INDICATOR DEFINITIONS WITH ENHANCED SEARCH PATTERNS
@@ -65,7 +81,7 @@ INDICATORS_V3 = {
             r"Scope\s+1\s+GHG\s+emissions\s+.*?\d+.*?\|\s*(\d{1,3}[,\.]?\d{3})\s*\|"  # BPCE format from page 317
         ],
         "expected_range": (100, 1000000),  # Extended for ktCO2e conversion (576k)
-        "section_hints": ["GHG", "emissions", "climate", "environmental", "E1-6", "own footprint", "calculation methodology", "E1-6"]
+        "section_hints": ["GHG", "emissions", "climate", "environmental", "E1-6", "own footprint", "calculation methodology"]
     },
     "E2": {
         "id": "E2",
@@ -461,6 +477,32 @@ INDICATORS_V3 = {
     }
 }
 
+# Derived lookups for the search loops, built once at import: compiled table
+# patterns and lowercased, de-duplicated terms, so the per-page loops never
+# re-parse a regex or scan for the same term twice
+for _ind in INDICATORS_V3.values():
+    _ind["_compiled_patterns"] = [re.compile(p, re.IGNORECASE) for p in _ind["table_patterns"]]
+    _ind["_search_terms_lower"] = list(dict.fromkeys(t.lower() for t in _ind["search_terms"]))
+    _ind["_section_hints_lower"] = list(dict.fromkeys(h.lower() for h in _ind["section_hints"]))
+del _ind
+
+# Every distinct lowercased term/hint -> (indicator_id, weight, exact-phrase
+# bonus) for each place it is listed, so a page is scanned for each term once
+# however many indicators share it
+TERM_INDEX: Dict[str, List[Tuple[str, int, int]]] = {}
+for _ind_id, _ind in INDICATORS_V3.items():
+    for _term in _ind["_search_terms_lower"]:
+        TERM_INDEX.setdefault(_term, []).append((_ind_id, 10, 5))
+    for _hint in _ind["_section_hints_lower"]:
+        TERM_INDEX.setdefault(_hint, []).append((_ind_id, 3, 0))
+del _ind_id, _ind, _term, _hint
+
+# Patterns shared by the search helpers
+DIGIT_RUN_RE = re.compile(r'\d{3,}')
+# Deleting these leaves nothing of a plain number like "4,128" or "12 345.6"
+NUMERIC_GROUP_STRIP = str.maketrans("", "", "0123456789,. \t\n\r\f\v")
+TABLE_RUN_RE = re.compile(r'^[^\n]*\|[^\n]*\|[^\n]*(?:\n(?:[^\n]*\||[^\S\n]*-)[^\n]*)*', re.MULTILINE)
+
 
 # ============================================================================
 # SMART CONTEXT RETRIEVAL
@@ -469,35 +511,106 @@ INDICATORS_V3 = {
 def find_tables_in_text(text: str) -> List[Tuple[int, str]]:
     """Find table-like structures in the text with their positions."""
     tables = []
-    lines = text.split('\n')
+    line_no = 0
+    last_pos = 0
     
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        # Detect markdown tables (|) or structured data
-        if '|' in line and line.count('|') >= 2:
-            # Found potential table start
-            table_start = i
-            table_lines = []
-            while i < len(lines) and ('|' in lines[i] or lines[i].strip().startswith('-')):
-                table_lines.append(lines[i])
-                i += 1
-            if len(table_lines) >= 3:  # Minimum table size
-                tables.append((table_start, '\n'.join(table_lines)))
-        else:
-            i += 1
+    # A run starts on a line with 2+ '|' (markdown table) and continues over
+    # lines containing '|' or starting with '-'
+    for match in TABLE_RUN_RE.finditer(text):
+        block = match.group(0)
+        if block.count('\n') >= 2:  # Minimum table size
+            # Line numbers are counted incrementally instead of splitting the text
+            line_no += text.count('\n', last_pos, match.start())
+            last_pos = match.start()
+            tables.append((line_no, block))
     
     return tables
 
 
+@functools.lru_cache(maxsize=1)
+def split_pages(full_text: str) -> Tuple[str, ...]:
+    """
+    Split the document on PAGE BREAK markers.
+    
+    Cached so the per-indicator searches share one split of the document
+    instead of each building its own list of page copies.
+    """
+    return tuple(full_text.split('---PAGE BREAK---'))
+
+
 def get_page_content(full_text: str, page_num: int) -> str:
     """Extract content from a specific page (based on PAGE BREAK markers)."""
-    pages = full_text.split('---PAGE BREAK---')
+    pages = split_pages(full_text)
     if 0 <= page_num < len(pages):
         return pages[page_num]
     return ""
 
 
+@functools.lru_cache(maxsize=1)
+def page_term_scores(full_text: str) -> List[Dict[str, int]]:
+    """
+    Search-term and section-hint score of every page for every indicator.
+    
+    One pass over the document serves all indicators; the cache keeps the
+    result while the same document is searched indicator by indicator.
+    """
+    page_scores = []
+    for page_content in split_pages(full_text):
+        page_lower = page_content.lower()
+        padded = f" {page_lower} "
+        scores: Dict[str, int] = {}
+        for term, entries in TERM_INDEX.items():
+            if term not in page_lower:
+                continue
+            exact = f" {term} " in padded
+            for ind_id, weight, exact_bonus in entries:
+                scores[ind_id] = scores.get(ind_id, 0) + weight + (exact_bonus if exact else 0)
+        page_scores.append(scores)
+    return page_scores
+
+
+@functools.lru_cache(maxsize=1)
+def page_layout_scores(full_text: str) -> Tuple[int, ...]:
+    """
+    Indicator-independent part of each page's relevance score (tables and
+    numeric data), computed once per document rather than per indicator.
+    """
+    layout_scores = []
+    for page_content in split_pages(full_text):
+        score = 0
+        
+        # Bonus for pages with tables
+        if '|' in page_content and page_content.count('|') > 10:
+            score += 15
+        
+        # Bonus for pages with numbers (likely data); stop counting once it
+        # is earned rather than materialising every match
+        numbers_found = 0
+        for _ in DIGIT_RUN_RE.finditer(page_content):
+            numbers_found += 1
+            if numbers_found > 5:
+                score += 5
+                break
+        
+        layout_scores.append(score)
+    return tuple(layout_scores)
+
+
+@functools.lru_cache(maxsize=len(INDICATORS_V3))
+def pattern_page_hits(full_text: str, ind_id: str) -> Tuple[Tuple[int, ...], ...]:
+    """
+    For each of the indicator's table patterns, the indices of the pages it
+    matches. Shared by the regex extraction pass (which only needs to look
+    at these pages) and the context scoring bonus, so neither rescans the
+    document pattern by pattern.
+    """
+    pages = split_pages(full_text)
+    return tuple(
+        tuple(page_idx for page_idx, page_content in enumerate(pages) if pattern.search(page_content))
+        for pattern in INDICATORS_V3[ind_id]["_compiled_patterns"]
+    )
+
+
 def search_indicator_context(
     full_text: str,
     indicator: dict,
@@ -508,56 +621,41 @@ def search_indicator_context(
     
     Returns: (context_text, relevant_page_numbers)
     """
-    pages = full_text.split('---PAGE BREAK---')
+    pages = split_pages(full_text)
     scored_pages = []
     
-    search_terms = indicator.get("search_terms", [])
-    section_hints = indicator.get("section_hints", [])
-    table_patterns = indicator.get("table_patterns", [])
+    ind_id = indicator["id"]
+    term_scores = page_term_scores(full_text)
+    layout_scores = page_layout_scores(full_text)
+    
+    # Number of table patterns matching each page
+    pattern_hits: Dict[int, int] = {}
+    for hit_pages in pattern_page_hits(full_text, ind_id):
+        for page_idx in hit_pages:
+            pattern_hits[page_idx] = pattern_hits.get(page_idx, 0) + 1
     
     for page_idx, page_content in enumerate(pages):
-        page_lower = page_content.lower()
-        score = 0
-        
-        # Score based on search term matches
-        for term in search_terms:
-            if term.lower() in page_lower:
-                score += 10
-                # Bonus for exact phrase match
-                if f" {term.lower()} " in f" {page_lower} ":
-                    score += 5
-        
-        # Score based on section hints
-        for hint in section_hints:
-            if hint.lower() in page_lower:
-                score += 3
+        # Search terms (+10, +5 more for an exact phrase) and section hints (+3)
+        score = term_scores[page_idx].get(ind_id, 0)
         
-        # Bonus for pages with tables
-        if '|' in page_content and page_content.count('|') > 10:
-            score += 15
-        
-        # Bonus for pages with numbers (likely data)
-        numbers_found = len(re.findall(r'\d{3,}', page_content))
-        if numbers_found > 5:
-            score += 5
+        # Bonus for pages with tables (+15) and with numeric data (+5)
+        score += layout_scores[page_idx]
         
         # Check table patterns for strong matches
-        for pattern in table_patterns:
-            if re.search(pattern, page_content, re.IGNORECASE):
-                score += 25  # Strong bonus for pattern match
+        score += 25 * pattern_hits.get(page_idx, 0)  # Strong bonus per pattern match
         
         if score > 0:
             scored_pages.append((page_idx, score, page_content))
     
-    # Sort by score and take top pages
-    scored_pages.sort(key=lambda x: x[1], reverse=True)
+    # Take the top-scored pages (same order as a stable sort on score)
+    top_pages = heapq.nlargest(20, scored_pages, key=lambda x: x[1])
     
     # Build context from top-scored pages
     context_parts = []
     relevant_pages = []
     total_chars = 0
     
-    for page_idx, score, content in scored_pages[:20]:  # Max 20 pages
+    for page_idx, score, content in top_pages:  # Max 20 pages
         if total_chars + len(content) > max_context_chars:
             break
         context_parts.append(f"\n\n=== PAGE {page_idx + 1} (relevance score: {score}) ===\n\n{content}")
@@ -575,31 +673,43 @@ def search_full_document_for_indicator(
     Attempt regex-based extraction directly from document.
     Returns: (value, page_num, raw_text) or None
     """
-    pages = full_text.split('---PAGE BREAK---')
+    return _search_full_document_cached(full_text, indicator["id"])
+
+
+# The result depends only on the document text and the indicator, so repeat
+# runs over the same documents (e.g. from the web UI) skip the regex pass
+@functools.lru_cache(maxsize=64)
+def _search_full_document_cached(full_text: str, ind_id: str) -> Optional[Tuple[Any, int, str]]:
+    indicator = INDICATORS_V3[ind_id]
+    pages = split_pages(full_text)
     
-    # Year-like values to avoid (2019-2030 are often years, not data values)
-    year_pattern = re.compile(r'20[1-3][0-9]')
+    hits = pattern_page_hits(full_text, indicator["id"])
     
-    for pattern in indicator.get("table_patterns", []):
-        for page_idx, page_content in enumerate(pages):
-            matches = re.finditer(pattern, page_content, re.IGNORECASE)
+    for pattern, hit_pages in zip(indicator["_compiled_patterns"], hits):
+        for page_idx in hit_pages:
+            page_content = pages[page_idx]
+            matches = pattern.finditer(page_content)
             for match in matches:
                 try:
+                    # ktCO2e (kilotonnes) matches are converted to tCO2e below;
+                    # 'kt' also covers 'ktco2', so one check per match suffices
+                    is_kilotonnes = 'kt' in match.group(0).lower()
+                    
                     # Extract the number from the match
                     groups = match.groups()
                     for group in groups:
-                        if group and re.match(r'^[\d\s,\.]+$', group.strip()):
+                        candidate = group.strip() if group else ""
+                        if candidate and not candidate.translate(NUMERIC_GROUP_STRIP):
                             # Clean and convert the number
                             value_str = group.replace(' ', '').replace(',', '')
                             value = float(value_str)
                             
                             # Skip year-like values (2019-2030) unless it's the net zero target
-                            if indicator['id'] != 'E7' and year_pattern.match(str(int(value))) and 2010 <= value <= 2030:
+                            if indicator['id'] != 'E7' and 2010 <= value <= 2030:
                                 continue
                             
                             # Check for ktCO2e (kilotonnes) - convert to tCO2e
-                            matched_str = match.group(0).lower()
-                            if 'ktco2' in matched_str or 'kt' in matched_str:
+                            if is_kilotonnes:
                                 value = value * 1000  # Convert kilotonnes to tonnes
                             
                             # Validate against expected range
@@ -611,9 +721,9 @@ def search_full_document_for_indicator(
                                 raw_text = page_content[start:end].strip()
                                 
                                 # Additional context validation: check if indicator terms are nearby
-                                search_terms = indicator.get("search_terms", [])
+                                search_terms = indicator["_search_terms_lower"]
                                 raw_lower = raw_text.lower()
-                                term_found = any(term.lower() in raw_lower for term in search_terms[:5])
+                                term_found = any(term in raw_lower for term in search_terms[:5])
                                 
                                 if term_found:
                                     return (value, page_idx + 1, raw_text)
@@ -627,18 +737,66 @@ def search_full_document_for_indicator(
 # LLM EXTRACTION
 # ============================================================================
 
-def create_extraction_prompt(
-    bank_name: str,
-    indicator: dict,
-    context: str,
-    relevant_pages: List[int]
-) -> str:
-    """Create a highly focused extraction prompt for a single indicator."""
+# Thousands separators in LLM-reported numbers, including the no-break and
+# narrow no-break spaces French reports use ("576\u202f000")
+THOUSANDS_SEP_STRIP = str.maketrans("", "", ", \u00a0\u202f")
+
+
+def extract_json_object(text: str, required_key: Optional[str] = None) -> Optional[str]:
+    """
+    Find a JSON object in an LLM response with a brace-matching scan.
+    
+    Returns the first top-level object containing "required_key" (or the first
+    object at all if none does), tracking strings so braces inside values
+    don't count. Unlike a regex, this handles nested objects. A stray "{" that
+    is never closed (e.g. in prose before the JSON) is skipped and the scan
+    resumes just after it.
+    """
+    key = f'"{required_key}"' if required_key else None
+    first = None
+    pos = 0
     
-    # Determine document language hints
-    lang_hint = ""
-    if bank_name.upper() == "BPCE":
-        lang_hint = """
+    while pos < len(text):
+        depth = 0
+        start = 0
+        in_string = escape = False
+        
+        for i in range(pos, len(text)):
+            ch = text[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == '\\':
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '{':
+                if depth == 0:
+                    start = i
+                depth += 1
+            elif depth:
+                if ch == '"':
+                    in_string = True
+                elif ch == '}':
+                    depth -= 1
+                    if depth == 0:
+                        candidate = text[start:i + 1]
+                        if key is None or key in candidate:
+                            return candidate
+                        if first is None:
+                            first = candidate
+        
+        if not depth:
+            break
+        # Unbalanced: retry from just after the brace that never closed
+        pos = start + 1
+    
+    return first
+
+
+# Bank-specific guidance appended to the system instructions
+LANG_HINTS = {
+    "BPCE": """
 **LANGUAGE NOTE**: This document is in French. Look for French equivalents:
 - "émissions" = emissions, "collaborateurs/effectifs" = employees
 - "conseil d'administration" = board, "formation" = training
@@ -651,9 +809,8 @@ def create_extraction_prompt(
 - **TOTAL EMPLOYEES**: The Group total is "101,234 employees on December 31, 2024" (not subsidiary figures like 34,000)
   Look for "headcount increased" or "employees on December 31, 2024" context
 - Do NOT report subsidiary figures - look for GROUP-level totals
-"""
-    elif bank_name.upper() == "BBVA":
-        lang_hint = """
+""",
+    "BBVA": """
 **LANGUAGE NOTE**: This document may contain Spanish. Look for Spanish equivalents:
 - "emisiones" = emissions, "empleados" = employees
 - "consejo" = board, "formación" = training
@@ -663,22 +820,10 @@ def create_extraction_prompt(
   The table format shows: Male | Female columns with Total row at bottom
   For Total Employees, SUM both Male and Female totals (e.g., 60,999 + 64,917 = 125,916)
 - Look for "breakdown of the number of employees" or "category and gender" context
-"""
-    
-    return f"""You are an expert ESG data analyst extracting ONE SPECIFIC indicator from {bank_name}'s 2024 sustainability report.
-
-## TARGET INDICATOR
-- **ID**: {indicator['id']}
-- **Name**: {indicator['name']}
-- **Expected Unit**: {indicator['unit']}
-- **Expected Range**: {indicator.get('expected_range', 'N/A')}
-
-## SEARCH GUIDANCE
-Look for these terms: {', '.join(indicator['search_terms'][:10])}
-Check sections related to: {', '.join(indicator.get('section_hints', [])[:6])}
-{lang_hint}
+""",
+}
 
-## CRITICAL EXTRACTION RULES
+CRITICAL_RULES = """## CRITICAL EXTRACTION RULES
 
 1. **FOCUS ON 2024 DATA**: Only extract values for year 2024 (or FY2024, Dec 2024). If table has multiple years, select 2024 column.
 
@@ -708,13 +853,59 @@ Check sections related to: {', '.join(indicator.get('section_hints', [])[:6])}
    - 0.3-0.5: Value is estimated or unclear
    - 0.0: Indicator not found despite thorough search
 
-## DOCUMENT CONTENT
-Relevant pages: {relevant_pages}
+"""
 
-{context}
+
+@functools.lru_cache(maxsize=None)
+def extraction_system_prompt(bank_name: str) -> str:
+    """
+    Instructions shared by every extraction prompt for a bank. Sent as the
+    system message so each request starts with the same prefix, which
+    Gemini can serve from its context cache instead of re-reading it.
+    """
+    lang_hint = LANG_HINTS.get(bank_name.upper(), "")
+    return f"""You are an expert ESG data analyst extracting ONE SPECIFIC indicator at a time from {bank_name}'s 2024 sustainability report.
+{lang_hint}
+{CRITICAL_RULES}"""
+
+
+@functools.lru_cache(maxsize=None)
+def _prompt_parts(ind_id: str) -> Tuple[str, str]:
+    """
+    The fixed text before and after the document content for one indicator.
+    Only the context and page list change between calls.
+    """
+    indicator = INDICATORS_V3[ind_id]
+    
+    head = f"""## TARGET INDICATOR
+- **ID**: {indicator['id']}
+- **Name**: {indicator['name']}
+- **Expected Unit**: {indicator['unit']}
+- **Expected Range**: {indicator.get('expected_range', 'N/A')}
+
+## SEARCH GUIDANCE
+Look for these terms: {', '.join(indicator['search_terms'][:10])}
+Check sections related to: {', '.join(indicator.get('section_hints', [])[:6])}
+
+## DOCUMENT CONTENT
+"""
+    
+    tail = f"""
 
 ## OUTPUT FORMAT (JSON ONLY - no markdown, no explanation before/after)
 {{"indicator_id": "{indicator['id']}", "indicator_name": "{indicator['name']}", "value": <number or null>, "unit": "{indicator['unit']}", "confidence": <0.0-1.0>, "source_page": <page number or null>, "source_section": "<section name if found>", "notes": "<explain exactly where you found it OR why it couldn't be found>"}}"""
+    
+    return head, tail
+
+
+def create_extraction_prompt(
+    indicator: dict,
+    context: str,
+    relevant_pages: List[int]
+) -> str:
+    """Create the indicator-specific part of an extraction prompt (see extraction_system_prompt)."""
+    head, tail = _prompt_parts(indicator["id"])
+    return "".join([head, f"Relevant pages: {relevant_pages}\n\n", context, tail])
 
 
 def extract_indicator_with_llm(
@@ -726,26 +917,38 @@ def extract_indicator_with_llm(
 ) -> dict:
     """Extract a single indicator using LLM."""
     
-    prompt = create_extraction_prompt(bank_name, indicator, context, relevant_pages)
+    system_prompt = extraction_system_prompt(bank_name)
+    prompt = create_extraction_prompt(indicator, context, relevant_pages)
+    
+    cache = get_llm_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = LLMCache.make_key(settings.model_name, bank_name, indicator["id"], system_prompt + prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"    {indicator['id']} (cached LLM result)")
+            return cached
     
     try:
-        response = llm.invoke(prompt)
-        content = response.content.strip()
-        
-        # Extract JSON from response
-        json_match = re.search(r'\{[^{}]*"indicator_id"[^{}]*\}', content, re.DOTALL)
-        if not json_match:
-            # Try broader JSON match
-            json_match = re.search(r'\{[\s\S]*?\}', content)
-        
-        if json_match:
-            data = json.loads(json_match.group())
+        messages = [SystemMessage(content=system_prompt), HumanMessage(content=prompt)]
+        content = llm.invoke(messages).content.strip()
+    except Exception as e:
+        # API / network errors: surface them, but let other indicators continue
+        logger.warning(f"LLM call failed for {indicator['id']}: {e}")
+        content = ""
+    
+    # Extract JSON from response
+    json_text = extract_json_object(content, "indicator_id")
+    
+    if json_text:
+        try:
+            data = orjson.loads(json_text)
             
             # Validate and clean the extracted data
             value = data.get("value")
             if value is not None:
                 if isinstance(value, str):
-                    value = float(value.replace(',', '').replace(' ', ''))
+                    value = float(value.translate(THOUSANDS_SEP_STRIP))
                 # Validate against expected range
                 min_val, max_val = indicator.get("expected_range", (0, float('inf')))
                 if not (min_val <= value <= max_val):
@@ -759,13 +962,14 @@ def extract_indicator_with_llm(
                         # Likely needs /1000 conversion
                         data["value"] = value / 1000
                         data["notes"] = f"Converted from {value} (divided by 1000). " + data.get("notes", "")
-            
+        except (ValueError, TypeError) as e:
+            # Malformed JSON (orjson.JSONDecodeError is a ValueError), or a value
+            # that isn't a number
+            logger.debug(f"JSON parsing failed for {indicator['id']}: {e}")
+        else:
+            if cache_key is not None:
+                cache.set(cache_key, data)
             return data
-            
-    except json.JSONDecodeError as e:
-        logger.debug(f"JSON parsing failed for {indicator['id']}: {e}")
-    except Exception as e:
-        logger.debug(f"Extraction failed for {indicator['id']}: {e}")
     
     return {
         "indicator_id": indicator["id"],
@@ -810,13 +1014,17 @@ OUTPUT (JSON only):
 {{"verified": <true/false>, "correct_value": <number or null if wrong>, "correct_unit": "<unit>", "confidence": <0.0-1.0>, "reason": "<explanation>"}}"""
 
     try:
-        response = llm.invoke(prompt)
-        content = response.content.strip()
-        json_match = re.search(r'\{[\s\S]*?\}', content)
-        if json_match:
-            return json.loads(json_match.group())
-    except:
-        pass
+        content = llm.invoke(prompt).content.strip()
+    except Exception as e:
+        logger.warning(f"Verification call failed for {indicator['id']}: {e}")
+        content = ""
+    
+    json_text = extract_json_object(content, "verified")
+    if json_text:
+        try:
+            return orjson.loads(json_text)
+        except ValueError as e:
+            logger.debug(f"Verification JSON parsing failed for {indicator['id']}: {e}")
     
     return {"verified": True, "confidence": 0.5, "reason": "Verification failed"}
 
@@ -825,14 +1033,22 @@ OUTPUT (JSON only):
 # MAIN EXTRACTION PIPELINE
 # ============================================================================
 
+@functools.lru_cache(maxsize=8)
+def _read_document(path: Path, mtime_ns: int) -> str:
+    """Read a document; mtime_ns is part of the cache key so edits are picked up."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
 def load_processed_document(bank_name: str) -> str:
     """Load the full processed markdown document for a bank."""
     processed_dir = settings.processed_data_path / bank_name.lower()
     full_text_path = processed_dir / "full_text.md"
     
     if full_text_path.exists():
-        with open(full_text_path, "r", encoding="utf-8") as f:
-            return f.read()
+        # Repeat runs get the same string object back, so the per-document
+        # search caches hit without re-reading or re-comparing the text
+        return _read_document(full_text_path, full_text_path.stat().st_mtime_ns)
     
     # Fallback: concatenate all page files
     pages_dir = processed_dir / "pages"
@@ -846,10 +1062,63 @@ def load_processed_document(bank_name: str) -> str:
     return ""
 
 
+def in_core_range(indicator: dict, value: Any) -> bool:
+    """True if value sits in the middle half of the indicator's expected range."""
+    if "expected_range" not in indicator:
+        return False
+    try:
+        value = float(value.translate(THOUSANDS_SEP_STRIP) if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        return False
+    min_val, max_val = indicator["expected_range"]
+    margin = 0.25 * (max_val - min_val)
+    return min_val + margin <= value <= max_val - margin
+
+
+def extract_with_llm_and_verify(
+    llm: ChatVertexAI,
+    bank_name: str,
+    indicator: dict,
+    context: str,
+    relevant_pages: List[int]
+) -> dict:
+    """LLM extraction for one indicator, plus a verification pass if confidence is low."""
+    ind_id = indicator["id"]
+    
+    # Step 3: LLM extraction
+    result = extract_indicator_with_llm(llm, bank_name, indicator, context, relevant_pages)
+    
+    # Step 4: Verify if low confidence but has value. A fairly confident value
+    # well inside the plausible range is accepted without a second LLM call.
+    confidence = result.get("confidence", 0)
+    if result.get("value") is not None and 0.6 <= confidence < 0.75 and in_core_range(indicator, result["value"]):
+        logger.info(f"    ? {ind_id} verification skipped (in-range): {result['value']} (conf: {confidence})")
+        result["confidence"] = 0.75
+    elif result.get("value") is not None and 0.3 < confidence < 0.75:
+        logger.info(f"    ? {ind_id} verifying: {result['value']} (conf: {result.get('confidence')})")
+        verification = verify_extraction(llm, bank_name, indicator, result["value"], context)
+        
+        if verification.get("verified") and verification.get("correct_value"):
+            result["value"] = verification["correct_value"]
+            result["confidence"] = verification.get("confidence", result["confidence"])
+            result["notes"] = f"Verified: {verification.get('reason', '')}. " + result.get("notes", "")
+        elif not verification.get("verified"):
+            result["confidence"] = max(0.2, result.get("confidence", 0) - 0.2)
+            result["notes"] = f"Verification uncertain: {verification.get('reason', '')}. " + result.get("notes", "")
+    
+    if result.get("value") is not None:
+        logger.info(f"    [OK] {ind_id} LLM found: {result['value']} {result['unit']} (conf: {result.get('confidence', 0):.2f})")
+    else:
+        logger.info(f"    - {ind_id} not found: {result.get('notes', '')[:80]}")
+    
+    return result
+
+
 def extract_all_indicators_v3(
     llm: ChatVertexAI,
     bank_name: str,
-    full_text: str
+    full_text: str,
+    on_event: Optional[EventCallback] = None
 ) -> List[dict]:
     """
     V3 Extraction Pipeline:
@@ -857,83 +1126,81 @@ def extract_all_indicators_v3(
     2. Try regex extraction first (fast, cheap)
     3. Use LLM for complex extractions
     4. Verify low-confidence extractions
+    
+    Steps 1-2 run in order on this thread; steps 3-4 are independent
+    network round-trips, so they run concurrently on a thread pool.
+    The "indicator" event is sent from this thread once each indicator's
+    result is ready, so progress tracks finished work.
     """
     
-    all_extractions = []
+    results: Dict[str, dict] = {}
+    pending: Dict[Future, str] = {}
     
-    for ind_id, indicator in INDICATORS_V3.items():
-        logger.info(f"  Extracting {ind_id}: {indicator['name']}...")
-        
-        # Step 1: Try direct regex extraction
-        regex_result = search_full_document_for_indicator(full_text, indicator)
-        
-        if regex_result:
-            value, page_num, raw_text = regex_result
-            logger.info(f"    [OK] Regex found: {value} {indicator['unit']} (page {page_num})")
+    with ThreadPoolExecutor(max_workers=settings.llm_max_workers, thread_name_prefix="llm") as executor:
+        for ind_id, indicator in INDICATORS_V3.items():
+            logger.info(f"  Extracting {ind_id}: {indicator['name']}...")
             
-            all_extractions.append({
-                "indicator_id": ind_id,
-                "indicator_name": indicator["name"],
-                "value": value,
-                "unit": indicator["unit"],
-                "confidence": 0.85,  # High confidence for regex match
-                "source_page": page_num,
-                "notes": f"Regex extraction: {raw_text[:200]}"
-            })
-            continue
-        
-        # Step 2: Get targeted context for LLM
-        context, relevant_pages = search_indicator_context(full_text, indicator)
-        
-        if not context:
-            logger.info(f"    - No relevant context found")
-            all_extractions.append({
-                "indicator_id": ind_id,
-                "indicator_name": indicator["name"],
-                "value": None,
-                "unit": indicator["unit"],
-                "confidence": 0.0,
-                "source_page": None,
-                "notes": "No relevant context found in document"
-            })
-            continue
-        
-        # Step 3: LLM extraction
-        result = extract_indicator_with_llm(llm, bank_name, indicator, context, relevant_pages)
-        
-        # Step 4: Verify if low confidence but has value
-        if result.get("value") is not None and 0.3 < result.get("confidence", 0) < 0.75:
-            logger.info(f"    ? Verifying: {result['value']} (conf: {result.get('confidence')})")
-            verification = verify_extraction(llm, bank_name, indicator, result["value"], context)
+            # Step 1: Try direct regex extraction
+            regex_result = search_full_document_for_indicator(full_text, indicator)
             
-            if verification.get("verified") and verification.get("correct_value"):
-                result["value"] = verification["correct_value"]
-                result["confidence"] = verification.get("confidence", result["confidence"])
-                result["notes"] = f"Verified: {verification.get('reason', '')}. " + result.get("notes", "")
-            elif not verification.get("verified"):
-                result["confidence"] = max(0.2, result.get("confidence", 0) - 0.2)
-                result["notes"] = f"Verification uncertain: {verification.get('reason', '')}. " + result.get("notes", "")
-        
-        if result.get("value") is not None:
-            logger.info(f"    [OK] LLM found: {result['value']} {result['unit']} (conf: {result.get('confidence', 0):.2f})")
-        else:
-            logger.info(f"    - Not found: {result.get('notes', '')[:80]}")
+            if regex_result:
+                value, page_num, raw_text = regex_result
+                logger.info(f"    [OK] Regex found: {value} {indicator['unit']} (page {page_num})")
+                
+                results[ind_id] = {
+                    "indicator_id": ind_id,
+                    "indicator_name": indicator["name"],
+                    "value": value,
+                    "unit": indicator["unit"],
+                    "confidence": 0.85,  # High confidence for regex match
+                    "source_page": page_num,
+                    "notes": f"Regex extraction: {raw_text[:200]}"
+                }
+                emit(on_event, "indicator", bank=bank_name, indicator_id=ind_id, name=indicator["name"])
+                continue
+            
+            # Step 2: Get targeted context for LLM
+            context, relevant_pages = search_indicator_context(full_text, indicator)
+            
+            if not context:
+                logger.info(f"    - No relevant context found")
+                results[ind_id] = {
+                    "indicator_id": ind_id,
+                    "indicator_name": indicator["name"],
+                    "value": None,
+                    "unit": indicator["unit"],
+                    "confidence": 0.0,
+                    "source_page": None,
+                    "notes": "No relevant context found in document"
+                }
+                emit(on_event, "indicator", bank=bank_name, indicator_id=ind_id, name=indicator["name"])
+                continue
+            
+            # Steps 3-4: LLM extraction and verification, in the background
+            future = executor.submit(
+                extract_with_llm_and_verify, llm, bank_name, indicator, context, relevant_pages
+            )
+            pending[future] = ind_id
         
-        all_extractions.append(result)
+        for future in as_completed(pending):
+            ind_id = pending[future]
+            results[ind_id] = future.result()
+            emit(on_event, "indicator", bank=bank_name, indicator_id=ind_id, name=INDICATORS_V3[ind_id]["name"])
     
-    return all_extractions
+    # Keep the indicator order regardless of completion order
+    return [results[ind_id] for ind_id in INDICATORS_V3]
 
 
-def run_extraction_v3():
-    """Run the V3 high-accuracy extraction pipeline."""
-    logger.info("=" * 70)
-    logger.info("CSRD EXTRACTION V3 - HIGH ACCURACY MODE")
-    logger.info("=" * 70)
-    
+@functools.lru_cache(maxsize=1)
+def get_llm() -> ChatVertexAI:
+    """
+    Shared Vertex AI client. Built on first use and reused for every indicator
+    and every later run in the same process, so its channel stays warm.
+    """
     settings.setup_google_credentials()
     
     # Initialize LLM with low temperature for accuracy
-    llm = ChatVertexAI(
+    return ChatVertexAI(
         model=settings.model_name,
         project=settings.project_id,
         location=settings.location,
@@ -941,6 +1208,58 @@ def run_extraction_v3():
         max_retries=3,
         max_output_tokens=4096,
     )
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Shared LLM response cache, or None when LLM_CACHE_ENABLED is off.
+    Only successfully parsed extractions are stored, so failures are retried.
+    """
+    if not settings.llm_cache_enabled:
+        return None
+    return LLMCache(settings.llm_cache_path)
+
+
+def count_found(indicators: List[CSRDIndicator]) -> Tuple[int, int]:
+    """Count indicators with a value, and those also at >= 0.7 confidence, in one pass."""
+    found = high_conf = 0
+    for ind in indicators:
+        if ind.value is not None:
+            found += 1
+            if ind.confidence_score >= 0.7:
+                high_conf += 1
+    return found, high_conf
+
+
+# Column order of the exported CSV (see csv_row)
+CSV_FIELDS = (
+    "company", "report_year", "indicator_id", "indicator_name", "value",
+    "unit", "confidence_score", "source_page", "notes",
+)
+
+
+def csv_row(bank_name: str, ind: CSRDIndicator) -> tuple:
+    """One exported CSV row, in CSV_FIELDS order."""
+    return (
+        bank_name, 2024, ind.indicator_id, ind.indicator_name, ind.value,
+        ind.unit, ind.confidence_score, ind.source_page, ind.notes,
+    )
+
+
+def run_extraction_v3(on_event: Optional[EventCallback] = None):
+    """Run the V3 high-accuracy extraction pipeline.
+    
+    on_event, if given, receives "bank_start", "indicator" and
+    "bank_complete" events as the run progresses.
+    """
+    logger.info("=" * 70)
+    logger.info("CSRD EXTRACTION V3 - HIGH ACCURACY MODE")
+    logger.info("=" * 70)
+    
+    llm = get_llm()
+    # Open the shared cache here, before pool threads race to create it
+    get_llm_cache()
     
     # Initialize database
     db = DatabaseHandler()
@@ -948,116 +1267,117 @@ def run_extraction_v3():
     banks = ["AIB", "BBVA", "BPCE"]
     all_results = {}
     
-    for bank_name in banks:
-        logger.info(f"\n{'=' * 70}")
-        logger.info(f"PROCESSING: {bank_name}")
-        logger.info("=" * 70)
-        
-        # Load document
-        full_text = load_processed_document(bank_name)
-        if not full_text:
-            logger.error(f"No document found for {bank_name}")
-            continue
-        
-        logger.info(f"Document loaded: {len(full_text):,} characters, ~{len(full_text.split('---PAGE BREAK---'))} pages")
-        
-        # Extract all indicators
-        extractions = extract_all_indicators_v3(llm, bank_name, full_text)
-        
-        # Convert to CSRDIndicator models
-        indicators = []
-        for ext in extractions:
-            try:
-                value = ext.get("value")
-                if value is not None and not isinstance(value, (int, float)):
-                    try:
-                        value = float(str(value).replace(",", "").replace(" ", ""))
-                    except:
-                        value = None
+    # Export CSV directly from results (not dependent on DB). Rows are
+    # written as each bank finishes; the file replaces the previous export
+    # only once the run is complete, so downloads never see a partial file.
+    output_path = settings.output_data_path / "extracted_indicators_v3.csv"
+    partial_path = output_path.with_name(output_path.name + ".partial")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(partial_path, 'w', newline='', encoding='utf-8') as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(CSV_FIELDS)
+            
+            for bank_name in banks:
+                logger.info(f"\n{'=' * 70}")
+                logger.info(f"PROCESSING: {bank_name}")
+                logger.info("=" * 70)
+                emit(on_event, "bank_start", bank=bank_name)
                 
-                confidence = ext.get("confidence", 0.0)
-                if isinstance(confidence, str):
-                    try:
-                        confidence = float(confidence)
-                    except:
-                        confidence = 0.0
+                # Load document
+                full_text = load_processed_document(bank_name)
+                if not full_text:
+                    logger.error(f"No document found for {bank_name}")
+                    continue
+                
+                logger.info(f"Document loaded: {len(full_text):,} characters, ~{len(split_pages(full_text))} pages")
+                
+                # Extract all indicators
+                extractions = extract_all_indicators_v3(llm, bank_name, full_text, on_event)
                 
-                source_page = ext.get("source_page")
-                if isinstance(source_page, list):
-                    source_page = source_page[0] if source_page else None
-                elif source_page is not None:
+                # Convert to CSRDIndicator models
+                indicators = []
+                for ext in extractions:
                     try:
-                        source_page = int(source_page)
-                    except:
-                        source_page = None
+                        value = ext.get("value")
+                        if value is not None and not isinstance(value, (int, float)):
+                            try:
+                                value = float(str(value).translate(THOUSANDS_SEP_STRIP))
+                            except:
+                                value = None
+                        
+                        confidence = ext.get("confidence", 0.0)
+                        if isinstance(confidence, str):
+                            try:
+                                confidence = float(confidence)
+                            except:
+                                confidence = 0.0
+                        
+                        source_page = ext.get("source_page")
+                        if isinstance(source_page, list):
+                            source_page = source_page[0] if source_page else None
+                        elif source_page is not None:
+                            try:
+                                source_page = int(source_page)
+                            except:
+                                source_page = None
+                        
+                        indicator = CSRDIndicator(
+                            indicator_id=str(ext.get("indicator_id", "")),
+                            indicator_name=str(ext.get("indicator_name", "")),
+                            value=value,
+                            unit=str(ext.get("unit", "")),
+                            confidence_score=float(confidence),
+                            source_page=source_page,
+                            source_section=ext.get("source_section"),
+                            notes=str(ext.get("notes", "")) if ext.get("notes") else None,
+                        )
+                        indicators.append(indicator)
+                    except Exception as e:
+                        logger.warning(f"Failed to create indicator from {ext}: {e}")
                 
-                indicator = CSRDIndicator(
-                    indicator_id=str(ext.get("indicator_id", "")),
-                    indicator_name=str(ext.get("indicator_name", "")),
-                    value=value,
-                    unit=str(ext.get("unit", "")),
-                    confidence_score=float(confidence),
-                    source_page=source_page,
-                    source_section=ext.get("source_section"),
-                    notes=str(ext.get("notes", "")) if ext.get("notes") else None,
+                # Build result
+                result = BankExtractionResult(
+                    company=bank_name,
+                    report_year=2024,
+                    pdf_filename=f"{bank_name.lower()}_2024.pdf",
+                    indicators=indicators,
                 )
-                indicators.append(indicator)
-            except Exception as e:
-                logger.warning(f"Failed to create indicator from {ext}: {e}")
-        
-        # Build result
-        result = BankExtractionResult(
-            company=bank_name,
-            report_year=2024,
-            pdf_filename=f"{bank_name.lower()}_2024.pdf",
-            indicators=indicators,
-        )
-        result.calculate_metrics()
-        
-        all_results[bank_name] = result
-        
-        # Save to database (optional - skip if DB unavailable)
-        try:
-            db.save_extraction_result(result)
-        except Exception as db_err:
-            logger.warning(f"Could not save to DB (skipping): {db_err}")
-        
-        # Summary
-        found = sum(1 for i in indicators if i.value is not None)
-        high_conf = sum(1 for i in indicators if i.value is not None and i.confidence_score >= 0.7)
-        
-        logger.info(f"\n{bank_name} SUMMARY:")
-        logger.info(f"  Total indicators: {len(indicators)}")
-        logger.info(f"  Values found: {found}/{len(indicators)} ({100*found/len(indicators):.1f}%)")
-        logger.info(f"  High confidence (>=0.7): {high_conf}")
-        logger.info(f"  Average confidence: {result.avg_confidence:.2f}")
+                result.calculate_metrics()
+                
+                all_results[bank_name] = result
+                
+                try:
+                    csv_writer.writerows(csv_row(bank_name, ind) for ind in indicators)
+                    csv_file.flush()
+                except Exception as csv_err:
+                    logger.warning(f"CSV export failed for {bank_name}: {csv_err}")
+                
+                # Save to database (optional - skip if DB unavailable)
+                try:
+                    db.save_extraction_result(result)
+                except Exception as db_err:
+                    logger.warning(f"Could not save to DB (skipping): {db_err}")
+                
+                # Summary
+                found, high_conf = count_found(indicators)
+                
+                logger.info(f"\n{bank_name} SUMMARY:")
+                logger.info(f"  Total indicators: {len(indicators)}")
+                logger.info(f"  Values found: {found}/{len(indicators)} ({100*found/len(indicators):.1f}%)")
+                logger.info(f"  High confidence (>=0.7): {high_conf}")
+                logger.info(f"  Average confidence: {result.avg_confidence:.2f}")
+                emit(on_event, "bank_complete", bank=bank_name, found=found,
+                     total=len(indicators), high_conf=high_conf)
+    except BaseException:
+        # Don't leave a half-written export behind
+        partial_path.unlink(missing_ok=True)
+        raise
     
-    # Export CSV directly from results (not dependent on DB)
-    output_path = settings.output_data_path / "extracted_indicators_v3.csv"
     try:
-        rows = []
-        for bank_name, result in all_results.items():
-            for ind in result.indicators:
-                rows.append({
-                    'company': bank_name,
-                    'report_year': 2024,
-                    'indicator_id': ind.indicator_id,
-                    'indicator_name': ind.indicator_name,
-                    'value': ind.value,
-                    'unit': ind.unit,
-                    'confidence_score': ind.confidence_score,
-                    'source_page': ind.source_page,
-                    'notes': ind.notes
-                })
-        
-        import csv
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            if rows:
-                writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                writer.writeheader()
-                writer.writerows(rows)
+        partial_path.replace(output_path)
         logger.info(f"Exported to: {output_path}")
-    except Exception as csv_err:
+    except OSError as csv_err:
         logger.warning(f"CSV export failed: {csv_err}")
     
     logger.info(f"\n{'=' * 70}")
@@ -1069,8 +1389,7 @@ def run_extraction_v3():
     total_high_conf = 0
     
     for bank, result in all_results.items():
-        found = sum(1 for i in result.indicators if i.value is not None)
-        high_conf = sum(1 for i in result.indicators if i.value is not None and i.confidence_score >= 0.7)
+        found, high_conf = count_found(result.indicators)
         total_found += found
         total_high_conf += high_conf
         total_indicators += len(result.indicators)
@@ -15,16 +15,17 @@ CREATE TABLE IF NOT EXISTS sustainability_indicators (
     source_section VARCHAR(200),
     notes TEXT,
     extraction_method VARCHAR(50) DEFAULT 'llm',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    
-    -- Ensure unique combination per bank/year/indicator
-    CONSTRAINT unique_indicator UNIQUE (company, report_year, indicator_id)
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Ensure unique combination per bank/year/indicator; also covers lookups by
+-- company and carries the small value columns for index-only reads
+CREATE UNIQUE INDEX IF NOT EXISTS unique_indicator
+    ON sustainability_indicators(company, report_year, indicator_id)
+    INCLUDE (value, unit, confidence_score, source_page);
+
 -- Index for faster queries
-CREATE INDEX IF NOT EXISTS idx_company ON sustainability_indicators(company);
-CREATE INDEX IF NOT EXISTS idx_indicator_id ON sustainability_indicators(indicator_id);
 CREATE INDEX IF NOT EXISTS idx_report_year ON sustainability_indicators(report_year);
 
 -- View for summary statistics
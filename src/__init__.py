@@ -9,6 +9,7 @@ from .models import (
     BankExtractionResult,
 )
 from .database_handler import DatabaseHandler
+from .llm_cache import LLMCache
 
 __all__ = [
     "CSRDIndicator",
@@ -17,4 +18,5 @@ __all__ = [
     "GovernanceData",
     "BankExtractionResult",
     "DatabaseHandler",
+    "LLMCache",
 ]
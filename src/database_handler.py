@@ -3,10 +3,13 @@ CSRD Data Extraction Engine - Database Handler
 
 SQLAlchemy ORM for PostgreSQL with CRUD operations and CSV export.
 """
+import csv
+import io
+import itertools
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any
 from contextlib import contextmanager
 import uuid
 
@@ -18,14 +21,16 @@ from sqlalchemy import (
     Float,
     Text,
     DateTime,
-    UniqueConstraint,
     Index,
+    delete,
+    func,
+    select,
 )
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
-from sqlalchemy.dialects.postgresql import UUID
-import pandas as pd
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
 
-from .models import CSRDIndicator, BankExtractionResult
+from .models import CSRDIndicator, BankExtractionResult, CSV_COLUMNS
 
 logger = logging.getLogger(__name__)
 
@@ -38,9 +43,9 @@ class SustainabilityIndicator(Base):
     __tablename__ = "sustainability_indicators"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    company = Column(String(100), nullable=False, index=True)
+    company = Column(String(100), nullable=False)
     report_year = Column(Integer, nullable=False, index=True)
-    indicator_id = Column(String(20), nullable=False, index=True)
+    indicator_id = Column(String(20), nullable=False)
     indicator_name = Column(String(200), nullable=False)
     value = Column(Float, nullable=True)
     unit = Column(String(50), nullable=False)
@@ -48,13 +53,17 @@ class SustainabilityIndicator(Base):
     source_page = Column(Integer, nullable=True)
     source_section = Column(String(200), nullable=True)
     notes = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Stamped by PostgreSQL, so inserts and upserts don't bind a timestamp per row
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
-    # Constraints
+    # Constraints. The unique index also serves company lookups (its leading
+    # column), and carries the small value columns so reads of them can be
+    # index-only; notes/source_section stay out to keep index tuples small.
     __table_args__ = (
-        UniqueConstraint('company', 'report_year', 'indicator_id', 
-                        name='uq_company_year_indicator'),
+        Index('uq_company_year_indicator', 'company', 'report_year', 'indicator_id',
+              unique=True,
+              postgresql_include=['value', 'unit', 'confidence_score', 'source_page']),
         Index('ix_confidence_desc', confidence_score.desc()),
     )
     
@@ -77,6 +86,67 @@ class SustainabilityIndicator(Base):
         }
 
 
+# Columns an upsert overwrites when the (company, report_year, indicator_id)
+# row already exists
+UPSERT_UPDATE_COLUMNS = (
+    "value",
+    "unit",
+    "confidence_score",
+    "source_page",
+    "source_section",
+    "notes",
+)
+
+
+def _build_upsert_statement():
+    """INSERT ... ON CONFLICT DO UPDATE on the (company, report_year, indicator_id) key."""
+    stmt = pg_insert(SustainabilityIndicator.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["company", "report_year", "indicator_id"],
+        set_={
+            **{col: stmt.excluded[col] for col in UPSERT_UPDATE_COLUMNS},
+            "updated_at": func.now(),
+        },
+    ).execution_options(preserve_rowcount=True)
+
+
+# Built once and executed with a list of row dicts, so each save only binds
+# parameters; psycopg2 sends the rows as multi-row VALUES pages
+UPSERT_STMT = _build_upsert_statement()
+
+
+# Columns of export_to_csv, in file order (same as the result model's CSV rows)
+CSV_EXPORT_COLUMNS = CSV_COLUMNS
+
+# Rows fetched per round-trip when streaming exports and indicator reads
+EXPORT_BATCH_SIZE = 10_000
+
+# Columns written by bulk_load_indicators, in COPY order
+COPY_COLUMNS = (
+    "id",
+    "company",
+    "report_year",
+    "indicator_id",
+    "indicator_name",
+    "value",
+    "unit",
+    "confidence_score",
+    "source_page",
+    "source_section",
+    "notes",
+)
+
+# Backslash escapes for COPY's text format
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_field(value: Any) -> str:
+    """Render one value as a COPY text-format field (\\N for NULL)."""
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+
 class ExtractionRun(Base):
     """SQLAlchemy model for tracking extraction runs."""
     
@@ -112,11 +182,42 @@ class DatabaseHandler:
         
         self.database_url = database_url or settings.database_url
         
+        url = make_url(self.database_url)
+        engine_options = {}
+        if url.get_backend_name() != "sqlite":
+            # Keep a warm working set of connections for concurrent runs; LIFO
+            # checkout reuses the most recent connection and lets idle extras
+            # age out via pool_recycle
+            engine_options.update(
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_recycle=600,
+                pool_use_lifo=True,
+            )
+        if url.get_backend_name() == "postgresql":
+            # Detect dead connections with libpq TCP keepalives instead of a
+            # pre-ping SELECT 1 round-trip on every checkout
+            engine_options["connect_args"] = {
+                "keepalives": 1,
+                "keepalives_idle": 30,
+                "keepalives_interval": 10,
+                "keepalives_count": 5,
+                "connect_timeout": 5,
+            }
+        if url.get_driver_name() == "psycopg2":
+            # Send executemany() INSERTs as multi-row VALUES and UPDATE/DELETE
+            # through execute_batch, instead of one round-trip per row
+            engine_options.update(
+                executemany_mode="values_plus_batch",
+                insertmanyvalues_page_size=1000,
+                executemany_batch_page_size=500,
+            )
+        
         # Create engine
         self.engine = create_engine(
             self.database_url,
             echo=False,  # Set to True for SQL debugging
-            pool_pre_ping=True,  # Check connections before use
+            **engine_options,
         )
         
         # Create session factory
@@ -151,34 +252,76 @@ class DatabaseHandler:
         finally:
             session.close()
     
-    def save_indicator(self, indicator: CSRDIndicator, company: str, report_year: int) -> str:
+    @staticmethod
+    def _to_model(indicator: CSRDIndicator, company: str, report_year: int) -> SustainabilityIndicator:
+        """Build the ORM row for an indicator."""
+        return SustainabilityIndicator(
+            company=company,
+            report_year=report_year,
+            indicator_id=indicator.indicator_id,
+            indicator_name=indicator.indicator_name,
+            value=indicator.value,
+            unit=indicator.unit,
+            confidence_score=indicator.confidence_score,
+            source_page=indicator.source_page,
+            source_section=indicator.source_section,
+            notes=indicator.notes,
+        )
+    
+    def save_indicator(
+        self,
+        indicator: CSRDIndicator,
+        company: str,
+        report_year: int,
+        session: Optional[Session] = None,
+    ) -> str:
         """
         Save a single indicator to the database.
         
+        Without a session each call is its own transaction, which is fine
+        for one-off writes and debugging; in loops pass a shared session or
+        use save_indicators_bulk.
+        
         Args:
             indicator: The indicator to save
             company: Company name
             report_year: Report year
+            session: Optional session to write in (the caller commits)
             
         Returns:
             ID of the saved record
         """
+        if session is None:
+            with self.get_session() as session:
+                return self.save_indicator(indicator, company, report_year, session)
+        
+        db_indicator = self._to_model(indicator, company, report_year)
+        session.add(db_indicator)
+        session.flush()
+        return str(db_indicator.id)
+    
+    def save_indicators_bulk(
+        self,
+        indicators: List[CSRDIndicator],
+        company: str,
+        report_year: int,
+    ) -> List[str]:
+        """
+        Save many indicators in a single transaction and flush.
+        
+        Args:
+            indicators: The indicators to save
+            company: Company name
+            report_year: Report year
+            
+        Returns:
+            IDs of the saved records, in input order
+        """
         with self.get_session() as session:
-            db_indicator = SustainabilityIndicator(
-                company=company,
-                report_year=report_year,
-                indicator_id=indicator.indicator_id,
-                indicator_name=indicator.indicator_name,
-                value=indicator.value,
-                unit=indicator.unit,
-                confidence_score=indicator.confidence_score,
-                source_page=indicator.source_page,
-                source_section=indicator.source_section,
-                notes=indicator.notes,
-            )
-            session.add(db_indicator)
+            db_indicators = [self._to_model(ind, company, report_year) for ind in indicators]
+            session.add_all(db_indicators)
             session.flush()
-            return str(db_indicator.id)
+            return [str(db_indicator.id) for db_indicator in db_indicators]
     
     def save_extraction_result(self, result: BankExtractionResult) -> int:
         """
@@ -192,47 +335,110 @@ class DatabaseHandler:
         """
         logger.info(f"Saving extraction result for {result.company}")
         
-        saved_count = 0
+        # to_csv_dict_rows() already gives one dict per indicator keyed by column name
+        rows = result.to_csv_dict_rows()
         
-        with self.get_session() as session:
-            for indicator in result.indicators:
-                # Check for existing record
-                existing = session.query(SustainabilityIndicator).filter(
-                    SustainabilityIndicator.company == result.company,
-                    SustainabilityIndicator.report_year == result.report_year,
-                    SustainabilityIndicator.indicator_id == indicator.indicator_id,
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    existing.value = indicator.value
-                    existing.unit = indicator.unit
-                    existing.confidence_score = indicator.confidence_score
-                    existing.source_page = indicator.source_page
-                    existing.source_section = indicator.source_section
-                    existing.notes = indicator.notes
-                    existing.updated_at = datetime.utcnow()
-                else:
-                    # Insert new record
-                    db_indicator = SustainabilityIndicator(
-                        company=result.company,
-                        report_year=result.report_year,
-                        indicator_id=indicator.indicator_id,
-                        indicator_name=indicator.indicator_name,
-                        value=indicator.value,
-                        unit=indicator.unit,
-                        confidence_score=indicator.confidence_score,
-                        source_page=indicator.source_page,
-                        source_section=indicator.source_section,
-                        notes=indicator.notes,
-                    )
-                    session.add(db_indicator)
-                
-                saved_count += 1
+        saved_count = 0
+        if rows:
+            # One INSERT ... ON CONFLICT DO UPDATE for the whole result instead
+            # of a SELECT plus INSERT/UPDATE per indicator
+            with self.get_session() as session:
+                # PostgreSQL counts both inserted and updated rows
+                saved_count = session.execute(UPSERT_STMT, rows).rowcount
         
         logger.info(f"Saved {saved_count} indicators for {result.company}")
         return saved_count
     
+    def bulk_load_indicators(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upsert many indicators at once through PostgreSQL's COPY protocol.
+        
+        Meant for large imports (e.g. seeding from many reports), where it is
+        much faster than parameterised INSERTs. Rows are copied into a
+        temporary table and merged with the same ON CONFLICT rule as
+        save_extraction_result, so (company, report_year, indicator_id)
+        must be unique within one call.
+        
+        Args:
+            rows: Dicts with company, report_year and the CSRDIndicator
+                fields, as produced by BankExtractionResult.to_csv_dict_rows()
+            
+        Returns:
+            Number of rows inserted or updated
+        """
+        buffer = io.StringIO()
+        for row in rows:
+            record = {**row, "id": uuid.uuid4()}
+            buffer.write("\t".join(_copy_field(record.get(col)) for col in COPY_COLUMNS))
+            buffer.write("\n")
+        
+        if not buffer.tell():
+            return 0
+        buffer.seek(0)
+        
+        columns = ", ".join(COPY_COLUMNS)
+        updates = ", ".join(
+            [f"{col} = EXCLUDED.{col}" for col in UPSERT_UPDATE_COLUMNS] + ["updated_at = now()"]
+        )
+        
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(
+                "CREATE TEMP TABLE indicators_load "
+                "(LIKE sustainability_indicators INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.copy_expert(f"COPY indicators_load ({columns}) FROM STDIN", buffer)
+            cursor.execute(
+                f"INSERT INTO sustainability_indicators ({columns}) "
+                f"SELECT {columns} FROM indicators_load "
+                f"ON CONFLICT (company, report_year, indicator_id) DO UPDATE SET {updates}"
+            )
+            count = cursor.rowcount
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        
+        logger.info(f"Bulk loaded {count} indicators")
+        return count
+    
+    def iter_indicators(
+        self, 
+        company: Optional[str] = None,
+        report_year: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield indicators one at a time, optionally filtered.
+        
+        Rows are streamed from a server-side cursor in batches, so memory
+        stays flat however large the table is.
+        
+        Args:
+            company: Filter by company name
+            report_year: Filter by report year
+            
+        Yields:
+            Indicator dictionaries
+        """
+        stmt = select(SustainabilityIndicator)
+        
+        if company:
+            stmt = stmt.where(SustainabilityIndicator.company == company)
+        if report_year:
+            stmt = stmt.where(SustainabilityIndicator.report_year == report_year)
+        
+        stmt = stmt.order_by(
+            SustainabilityIndicator.company,
+            SustainabilityIndicator.indicator_id,
+        ).execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        
+        with self.get_session() as session:
+            for ind in session.scalars(stmt):
+                yield ind.to_dict()
+    
     def get_all_indicators(
         self, 
         company: Optional[str] = None,
@@ -248,20 +454,7 @@ class DatabaseHandler:
         Returns:
             List of indicator dictionaries
         """
-        with self.get_session() as session:
-            query = session.query(SustainabilityIndicator)
-            
-            if company:
-                query = query.filter(SustainabilityIndicator.company == company)
-            if report_year:
-                query = query.filter(SustainabilityIndicator.report_year == report_year)
-            
-            query = query.order_by(
-                SustainabilityIndicator.company,
-                SustainabilityIndicator.indicator_id,
-            )
-            
-            return [ind.to_dict() for ind in query.all()]
+        return list(self.iter_indicators(company, report_year))
     
     def get_low_confidence_indicators(
         self, 
@@ -276,12 +469,15 @@ class DatabaseHandler:
         Returns:
             List of low-confidence indicators
         """
+        stmt = select(SustainabilityIndicator).where(
+            SustainabilityIndicator.confidence_score < threshold
+        ).order_by(
+            SustainabilityIndicator.confidence_score
+        ).execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        
         with self.get_session() as session:
-            query = session.query(SustainabilityIndicator).filter(
-                SustainabilityIndicator.confidence_score < threshold
-            ).order_by(SustainabilityIndicator.confidence_score)
-            
-            return [ind.to_dict() for ind in query.all()]
+            # Convert batch by batch instead of holding every ORM object at once
+            return [ind.to_dict() for ind in session.scalars(stmt)]
     
     def get_summary_stats(self) -> Dict[str, Any]:
         """
@@ -290,28 +486,28 @@ class DatabaseHandler:
         Returns:
             Dictionary with statistics
         """
+        # One portable GROUP BY; company is NOT NULL, so the per-company
+        # counts add up to the table total without a second COUNT(*)
+        stmt = select(
+            SustainabilityIndicator.company,
+            func.count(SustainabilityIndicator.id).label("count"),
+            func.avg(SustainabilityIndicator.confidence_score).label("avg_confidence"),
+        ).group_by(SustainabilityIndicator.company)
+        
         with self.get_session() as session:
-            total = session.query(SustainabilityIndicator).count()
-            
-            # Get counts by company
-            from sqlalchemy import func
-            company_counts = session.query(
-                SustainabilityIndicator.company,
-                func.count(SustainabilityIndicator.id).label("count"),
-                func.avg(SustainabilityIndicator.confidence_score).label("avg_confidence"),
-            ).group_by(SustainabilityIndicator.company).all()
-            
-            return {
-                "total_indicators": total,
-                "by_company": [
-                    {
-                        "company": c.company,
-                        "count": c.count,
-                        "avg_confidence": round(c.avg_confidence, 3) if c.avg_confidence else 0,
-                    }
-                    for c in company_counts
-                ],
-            }
+            rows = session.execute(stmt).all()
+        
+        return {
+            "total_indicators": sum(r.count for r in rows),
+            "by_company": [
+                {
+                    "company": r.company,
+                    "count": r.count,
+                    "avg_confidence": round(r.avg_confidence, 3) if r.avg_confidence else 0,
+                }
+                for r in rows
+            ],
+        }
     
     def export_to_csv(
         self, 
@@ -330,38 +526,41 @@ class DatabaseHandler:
         Returns:
             Number of rows exported
         """
-        indicators = self.get_all_indicators(company, report_year)
+        table = SustainabilityIndicator.__table__
+        stmt = select(*[table.c[col] for col in CSV_EXPORT_COLUMNS])
         
-        if not indicators:
-            logger.warning("No indicators to export")
-            return 0
+        if company:
+            stmt = stmt.where(table.c.company == company)
+        if report_year:
+            stmt = stmt.where(table.c.report_year == report_year)
         
-        df = pd.DataFrame(indicators)
-        
-        # Reorder columns for better readability
-        column_order = [
-            "company",
-            "report_year",
-            "indicator_id",
-            "indicator_name",
-            "value",
-            "unit",
-            "confidence_score",
-            "source_page",
-            "source_section",
-            "notes",
-        ]
-        
-        # Only include columns that exist
-        columns = [c for c in column_order if c in df.columns]
-        df = df[columns]
-        
-        # Save to CSV
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(output_path, index=False, encoding="utf-8")
-        
-        logger.info(f"Exported {len(df)} rows to {output_path}")
-        return len(df)
+        stmt = stmt.order_by(table.c.company, table.c.indicator_id)
+        
+        # Stream plain row tuples from a server-side cursor straight into the
+        # CSV writer, a batch at a time, rather than loading ORM objects,
+        # dicts and a DataFrame for the whole table
+        exported = 0
+        with self.engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=EXPORT_BATCH_SIZE
+            ).execute(stmt)
+            batches = result.partitions()
+            
+            first_batch = next(batches, None)
+            if first_batch is None:
+                logger.warning("No indicators to export")
+                return 0
+            
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_EXPORT_COLUMNS)
+                for batch in itertools.chain([first_batch], batches):
+                    writer.writerows(batch)
+                    exported += len(batch)
+        
+        logger.info(f"Exported {exported} rows to {output_path}")
+        return exported
     
     def delete_company_data(self, company: str, report_year: Optional[int] = None) -> int:
         """
@@ -374,15 +573,19 @@ class DatabaseHandler:
         Returns:
             Number of rows deleted
         """
+        stmt = delete(SustainabilityIndicator).where(
+            SustainabilityIndicator.company == company
+        )
+        if report_year:
+            stmt = stmt.where(SustainabilityIndicator.report_year == report_year)
+        
         with self.get_session() as session:
-            query = session.query(SustainabilityIndicator).filter(
-                SustainabilityIndicator.company == company
+            # Nothing in the short-lived session refers to these rows, so skip
+            # synchronising the identity map
+            result = session.execute(
+                stmt.execution_options(synchronize_session=False)
             )
-            
-            if report_year:
-                query = query.filter(SustainabilityIndicator.report_year == report_year)
-            
-            count = query.delete()
+            count = result.rowcount
             logger.warning(f"Deleted {count} indicators for {company}")
             return count
 
@@ -0,0 +1,69 @@
+"""
+CSRD Data Extraction Engine - LLM Response Cache
+
+SQLite-backed cache of parsed LLM extraction results, so re-running the
+pipeline over unchanged documents skips the Vertex AI round-trips.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Exact-match cache keyed by (model, bank, indicator, prompt).
+
+    The prompt embeds the retrieved context, so any change to the document,
+    the retrieval or the prompt template produces a new key.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared across threads, serialised by the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        logger.info(f"LLM cache at {self.db_path}")
+
+    @staticmethod
+    def make_key(model: str, bank_name: str, indicator_id: str, prompt: str) -> str:
+        """Hash the request fields into a cache key."""
+        payload = orjson.dumps(
+            {"model": model, "bank": bank_name, "indicator_id": indicator_id, "prompt": prompt},
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached result, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result, replacing any previous entry for the key."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?)",
+                (key, orjson.dumps(value)),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove every cached result."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
@@ -4,14 +4,16 @@ CSRD Data Extraction Engine - Pydantic Data Models
 Defines structured data models for ESG indicators with validation rules.
 """
 from datetime import datetime
-from typing import Optional, List, Any
-from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Optional, List, Any, Iterator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 import uuid
 
 
 class CSRDIndicator(BaseModel):
     """Base model for a single CSRD indicator extraction."""
     
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     indicator_id: str = Field(..., description="Indicator ID (E1, S3, G2, etc.)")
     indicator_name: str = Field(..., description="Full indicator name")
@@ -28,18 +30,18 @@ class CSRDIndicator(BaseModel):
     notes: Optional[str] = Field(None, description="Additional context or notes")
     raw_text: Optional[str] = Field(None, description="Original text excerpt")
     
-    @field_validator('confidence_score')
+    @field_validator('confidence_score', mode='after')
     @classmethod
-    def validate_confidence(cls, v: float) -> float:
-        """Ensure confidence is within valid range."""
-        if v < 0.0 or v > 1.0:
-            raise ValueError(f"Confidence score must be between 0.0 and 1.0, got {v}")
+    def round_confidence(cls, v: float) -> float:
+        """Round confidence to 3 decimals (the 0-1 range is enforced by the field)."""
         return round(v, 3)
 
 
 class EnvironmentalData(BaseModel):
     """Environmental indicators (E1-E8) with validation."""
     
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     scope_1_emissions: Optional[float] = Field(
         None, 
         description="Scope 1 direct GHG emissions in tCO₂e",
@@ -106,19 +108,13 @@ class EnvironmentalData(BaseModel):
                 pass
         
         return self
-    
-    @field_validator('renewable_energy_percentage')
-    @classmethod
-    def validate_percentage(cls, v: Optional[float]) -> Optional[float]:
-        """Ensure renewable percentage is valid."""
-        if v is not None and (v < 0 or v > 100):
-            raise ValueError(f"Renewable energy percentage must be 0-100, got {v}")
-        return v
 
 
 class SocialData(BaseModel):
     """Social indicators (S1-S7) with validation."""
     
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     total_employees: Optional[int] = Field(
         None, 
         description="Total number of full-time equivalent employees",
@@ -163,6 +159,8 @@ class SocialData(BaseModel):
 class GovernanceData(BaseModel):
     """Governance indicators (G1-G5) with validation."""
     
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     board_female_percentage: Optional[float] = Field(
         None, 
         description="Percentage of female board members (0-100)",
@@ -192,6 +190,21 @@ class GovernanceData(BaseModel):
     )
 
 
+# Column order of BankExtractionResult.to_csv_rows()
+CSV_COLUMNS = (
+    "company",
+    "report_year",
+    "indicator_id",
+    "indicator_name",
+    "value",
+    "unit",
+    "confidence_score",
+    "source_page",
+    "source_section",
+    "notes",
+)
+
+
 class BankExtractionResult(BaseModel):
     """Complete extraction result for a single bank."""
     
@@ -233,23 +246,26 @@ class BankExtractionResult(BaseModel):
             self.avg_confidence = sum(scores) / len(scores)
             self.low_confidence_count = sum(1 for s in scores if s < threshold)
     
-    def to_csv_rows(self) -> List[dict]:
-        """Convert extraction result to CSV-compatible rows."""
-        rows = []
+    def to_csv_rows(self) -> Iterator[tuple]:
+        """Yield one CSV row tuple per indicator, in CSV_COLUMNS order."""
+        company, report_year = self.company, self.report_year
         for indicator in self.indicators:
-            rows.append({
-                "company": self.company,
-                "report_year": self.report_year,
-                "indicator_id": indicator.indicator_id,
-                "indicator_name": indicator.indicator_name,
-                "value": indicator.value,
-                "unit": indicator.unit,
-                "confidence_score": indicator.confidence_score,
-                "source_page": indicator.source_page,
-                "source_section": indicator.source_section,
-                "notes": indicator.notes,
-            })
-        return rows
+            yield (
+                company,
+                report_year,
+                indicator.indicator_id,
+                indicator.indicator_name,
+                indicator.value,
+                indicator.unit,
+                indicator.confidence_score,
+                indicator.source_page,
+                indicator.source_section,
+                indicator.notes,
+            )
+    
+    def to_csv_dict_rows(self) -> List[dict]:
+        """Convert extraction result to CSV-compatible rows keyed by column name."""
+        return [dict(zip(CSV_COLUMNS, row)) for row in self.to_csv_rows()]
 
 
 class ExtractionError(BaseModel):
@@ -0,0 +1,227 @@
+// CSRD Extraction Engine - Dashboard Client
+
+let ws = null;
+let isRunning = false;
+const utf8Decoder = new TextDecoder();
+
+// Look up every element the handlers touch once (the script is deferred,
+// so the DOM is already parsed) instead of on every WebSocket message
+const els = {};
+[
+    'statusDot', 'statusText', 'runBtn', 'progressBar', 'progressPercent',
+    'currentTask', 'totalFound', 'accuracy', 'highConf', 'lastRun',
+    'lastDuration', 'logConsole',
+    'aibCard', 'bbvaCard', 'bpceCard',
+    'aibStats', 'bbvaStats', 'bpceStats',
+    'aibAccuracy', 'bbvaAccuracy', 'bpceAccuracy',
+].forEach(id => els[id] = document.getElementById(id));
+
+// Initialize WebSocket
+function connectWebSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
+    // The server sends pre-encoded JSON as binary frames
+    ws.binaryType = 'arraybuffer';
+    
+    ws.onmessage = (event) => {
+        const text = event.data instanceof ArrayBuffer
+            ? utf8Decoder.decode(event.data)
+            : event.data;
+        handleMessage(JSON.parse(text));
+    };
+    
+    ws.onclose = () => {
+        setTimeout(connectWebSocket, 3000);
+    };
+}
+
+function handleMessage(data) {
+    switch(data.type) {
+        case 'status':
+            updateStatus(data);
+            break;
+        case 'progress':
+            updateProgress(data);
+            break;
+        case 'log':
+            addLog(data.message, data.level);
+            break;
+        case 'log_batch':
+            // A replay carries the server's history, which supersedes the console
+            if (data.replay) {
+                els.logConsole.innerHTML = '';
+                pendingLogs = [];
+            }
+            data.entries.forEach(entry => addLog(entry.message, entry.level));
+            break;
+        case 'bank_complete':
+            updateBankCard(data);
+            break;
+        case 'complete':
+            extractionComplete(data);
+            break;
+        case 'stats':
+            updateStats(data);
+            break;
+        case 'stats_changed':
+            loadStats();
+            break;
+        case 'heartbeat':
+            break;
+    }
+}
+
+function updateStatus(data) {
+    const dot = els.statusDot;
+    const text = els.statusText;
+    
+    dot.className = 'status-dot ' + (data.running ? 'running' : 'idle');
+    text.textContent = data.running ? 'Running' : 'Ready';
+    isRunning = data.running;
+    
+    els.runBtn.disabled = isRunning;
+    els.runBtn.innerHTML = isRunning 
+        ? '<div class="spinner"></div> Extracting...' 
+        : '<span>▶</span> Start Extraction';
+}
+
+function updateProgress(data) {
+    const percent = Math.round((data.current / data.total) * 100);
+    els.progressBar.style.width = percent + '%';
+    els.progressPercent.textContent = percent + '%';
+    els.currentTask.textContent = data.task || 'Processing...';
+    
+    // Highlight active bank
+    ['aib', 'bbva', 'bpce'].forEach(bank => {
+        const card = els[bank + 'Card'];
+        card.classList.remove('active');
+    });
+    
+    if (data.bank) {
+        const bankCard = els[data.bank.toLowerCase() + 'Card'];
+        if (bankCard) bankCard.classList.add('active');
+    }
+}
+
+// Log entries are buffered and flushed once per animation frame so a burst
+// of messages costs a single layout/scroll instead of one per line
+let pendingLogs = [];
+let logFrame = 0;
+
+function addLog(message, level = 'info') {
+    pendingLogs.push([`[${new Date().toLocaleTimeString()}] ${message}`, level]);
+    if (!logFrame) logFrame = requestAnimationFrame(flushLogs);
+}
+
+function flushLogs() {
+    const console = els.logConsole;
+    const fragment = document.createDocumentFragment();
+    for (const [text, level] of pendingLogs) {
+        const entry = document.createElement('div');
+        entry.className = 'log-entry ' + (level || '');
+        entry.textContent = text;
+        fragment.appendChild(entry);
+    }
+    console.appendChild(fragment);
+    console.scrollTop = console.scrollHeight;
+    pendingLogs = [];
+    logFrame = 0;
+}
+
+function updateBankCard(data) {
+    const card = els[data.bank.toLowerCase() + 'Card'];
+    card.classList.remove('active');
+    card.classList.add('completed');
+    
+    els[data.bank.toLowerCase() + 'Stats'].textContent = 
+        `${data.found} / 20 indicators`;
+    els[data.bank.toLowerCase() + 'Accuracy'].textContent = 
+        `${data.accuracy}%`;
+}
+
+function extractionComplete(data) {
+    isRunning = false;
+    els.statusDot.className = 'status-dot idle';
+    els.statusText.textContent = 'Completed';
+    els.runBtn.disabled = false;
+    els.runBtn.innerHTML = '<span>▶</span> Start Extraction';
+    
+    updateStats(data);
+    addLog(`✅ Extraction complete! Total: ${data.total_found}/60 (${data.accuracy}%)`, 'success');
+}
+
+function updateStats(data) {
+    els.totalFound.textContent = data.total_found || '--';
+    els.accuracy.textContent = (data.accuracy || '--') + '%';
+    els.highConf.textContent = data.high_conf || '--';
+    
+    if (data.last_run) {
+        els.lastRun.textContent = data.last_run;
+    }
+    if (data.duration) {
+        els.lastDuration.textContent = `Duration: ${data.duration}`;
+    }
+}
+
+async function startExtraction() {
+    if (isRunning) return;
+    
+    // Clear console (including entries not yet rendered)
+    const console = els.logConsole;
+    console.innerHTML = '';
+    pendingLogs = [];
+    addLog('Starting extraction...', 'info');
+    
+    // Reset bank cards
+    ['aib', 'bbva', 'bpce'].forEach(bank => {
+        const card = els[bank + 'Card'];
+        card.classList.remove('active', 'completed');
+        els[bank + 'Stats'].textContent = '-- / 20 indicators';
+        els[bank + 'Accuracy'].textContent = '--%';
+    });
+    
+    try {
+        const response = await fetch('/api/extract', { method: 'POST' });
+        const data = await response.json();
+        
+        if (!data.success) {
+            addLog('Error: ' + data.error, 'error');
+        }
+    } catch (error) {
+        addLog('Failed to start extraction: ' + error.message, 'error');
+    }
+}
+
+// Load initial stats
+async function loadStats() {
+    try {
+        const response = await fetch('/api/stats');
+        const data = await response.json();
+        updateStats(data);
+        
+        // Update bank cards
+        if (data.banks) {
+            data.banks.forEach(bank => {
+                const bankName = bank.name.toLowerCase();
+                els[bankName + 'Stats'].textContent = 
+                    `${bank.found} / 20 indicators`;
+                els[bankName + 'Accuracy'].textContent = 
+                    `${bank.accuracy}%`;
+                if (bank.found > 0) {
+                    els[bankName + 'Card'].classList.add('completed');
+                }
+            });
+        }
+    } catch (error) {
+        console.error('Failed to load stats:', error);
+    }
+}
+
+// Download CSV file
+function downloadCSV() {
+    window.location.href = '/api/download';
+}
+
+// Initialize
+connectWebSocket();
+loadStats();
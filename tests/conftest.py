@@ -0,0 +1,24 @@
+"""
+CSRD Data Extraction Engine - Shared Test Fixtures
+"""
+import pytest
+from pathlib import Path
+import sys
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models import CSRDIndicator
+
+
+@pytest.fixture(scope="session")
+def base_indicator() -> CSRDIndicator:
+    """A valid Scope 1 indicator, built once (models are frozen, so safe to share)."""
+    return CSRDIndicator(
+        indicator_id="E1",
+        indicator_name="Scope 1 GHG Emissions",
+        value=15000,
+        unit="tCO₂e",
+        confidence_score=0.85,
+        source_page=42,
+    )
@@ -1,14 +1,9 @@
 """
 CSRD Data Extraction Engine - Extraction Tests
 
-Unit tests for the extraction engine and related components.
+Unit tests for the extraction engine, its models and validation rules.
 """
 import pytest
-from pathlib import Path
-import sys
-
-# Add project root to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.models import (
     CSRDIndicator,
@@ -17,21 +12,15 @@ from src.models import (
     GovernanceData,
     BankExtractionResult,
 )
+from src.llm_cache import LLMCache
 
 
 class TestCSRDIndicator:
     """Tests for CSRDIndicator model."""
     
-    def test_valid_indicator(self):
+    def test_valid_indicator(self, base_indicator):
         """Test creating a valid indicator."""
-        indicator = CSRDIndicator(
-            indicator_id="E1",
-            indicator_name="Scope 1 GHG Emissions",
-            value=15000,
-            unit="tCO₂e",
-            confidence_score=0.85,
-            source_page=42,
-        )
+        indicator = base_indicator
         
         assert indicator.indicator_id == "E1"
         assert indicator.value == 15000
@@ -49,37 +38,21 @@ class TestCSRDIndicator:
         
         assert indicator.value is None
     
-    def test_confidence_validation(self):
+    @pytest.mark.parametrize("score,ok", [(0.5, True), (1.5, False), (-0.1, False)])
+    def test_confidence_bounds(self, score, ok):
         """Test confidence score validation."""
-        # Valid confidence
-        indicator = CSRDIndicator(
+        kwargs = dict(
             indicator_id="E1",
             indicator_name="Test",
             value=100,
             unit="test",
-            confidence_score=0.5,
+            confidence_score=score,
         )
-        assert indicator.confidence_score == 0.5
-        
-        # Invalid confidence (too high)
-        with pytest.raises(ValueError):
-            CSRDIndicator(
-                indicator_id="E1",
-                indicator_name="Test",
-                value=100,
-                unit="test",
-                confidence_score=1.5,
-            )
-        
-        # Invalid confidence (negative)
-        with pytest.raises(ValueError):
-            CSRDIndicator(
-                indicator_id="E1",
-                indicator_name="Test",
-                value=100,
-                unit="test",
-                confidence_score=-0.1,
-            )
+        if ok:
+            assert CSRDIndicator(**kwargs).confidence_score == score
+        else:
+            with pytest.raises(ValueError):
+                CSRDIndicator(**kwargs)
 
 
 class TestEnvironmentalData:
@@ -98,19 +71,15 @@ class TestEnvironmentalData:
         assert data.scope_1_emissions == 15000
         assert data.renewable_energy_percentage == 67
     
-    def test_percentage_validation(self):
+    @pytest.mark.parametrize("pct,ok", [(50, True), (150, False), (-10, False)])
+    def test_percentage_validation(self, pct, ok):
         """Test renewable energy percentage validation."""
-        # Valid percentage
-        data = EnvironmentalData(renewable_energy_percentage=50)
-        assert data.renewable_energy_percentage == 50
-        
-        # Invalid percentage (> 100)
-        with pytest.raises(ValueError):
-            EnvironmentalData(renewable_energy_percentage=150)
-        
-        # Invalid percentage (< 0)
-        with pytest.raises(ValueError):
-            EnvironmentalData(renewable_energy_percentage=-10)
+        if ok:
+            data = EnvironmentalData(renewable_energy_percentage=pct)
+            assert data.renewable_energy_percentage == pct
+        else:
+            with pytest.raises(ValueError):
+                EnvironmentalData(renewable_energy_percentage=pct)
     
     def test_emissions_non_negative(self):
         """Test that emissions must be non-negative."""
@@ -135,17 +104,21 @@ class TestSocialData:
     
     def test_percentage_fields(self):
         """Test percentage field validation."""
-        # Valid percentages
         data = SocialData(
             female_employees_percentage=50,
             employee_turnover_rate=15,
             collective_bargaining_coverage=80,
         )
         assert data.female_employees_percentage == 50
-        
-        # Invalid turnover rate
-        with pytest.raises(ValueError):
-            SocialData(employee_turnover_rate=150)
+    
+    @pytest.mark.parametrize("rate,ok", [(15, True), (150, False), (-1, False)])
+    def test_turnover_rate_bounds(self, rate, ok):
+        """Test employee turnover rate validation."""
+        if ok:
+            assert SocialData(employee_turnover_rate=rate).employee_turnover_rate == rate
+        else:
+            with pytest.raises(ValueError):
+                SocialData(employee_turnover_rate=rate)
 
 
 class TestGovernanceData:
@@ -214,30 +187,25 @@ class TestBankExtractionResult:
         assert result.avg_confidence == 0.7
         assert result.low_confidence_count == 1
     
-    def test_to_csv_rows(self):
+    def test_to_csv_rows(self, base_indicator):
         """Test CSV row generation."""
         result = BankExtractionResult(
             company="AIB",
             report_year=2024,
             pdf_filename="aib_2024.pdf",
-            indicators=[
-                CSRDIndicator(
-                    indicator_id="E1",
-                    indicator_name="Scope 1",
-                    value=15000,
-                    unit="tCO₂e",
-                    confidence_score=0.85,
-                    source_page=42,
-                ),
-            ],
+            indicators=[base_indicator],
         )
         
-        rows = result.to_csv_rows()
+        rows = list(result.to_csv_rows())
+        
+        assert rows == [
+            ("AIB", 2024, "E1", "Scope 1 GHG Emissions", 15000, "tCO₂e", 0.85, 42, None, None),
+        ]
         
-        assert len(rows) == 1
-        assert rows[0]["company"] == "AIB"
-        assert rows[0]["indicator_id"] == "E1"
-        assert rows[0]["value"] == 15000
+        dict_rows = result.to_csv_dict_rows()
+        assert dict_rows[0]["company"] == "AIB"
+        assert dict_rows[0]["indicator_id"] == "E1"
+        assert dict_rows[0]["value"] == 15000
 
 
 class TestValidation:
@@ -254,5 +222,294 @@ class TestValidation:
         assert data.scope_2_market_based < data.scope_2_location_based
 
 
+class TestLLMCache:
+    """Tests for the LLM response cache."""
+    
+    def test_round_trip(self, tmp_path):
+        """Test a stored result is returned on the next lookup."""
+        cache = LLMCache(tmp_path / "cache.sqlite3")
+        key = LLMCache.make_key("model", "AIB", "E1", "prompt")
+        
+        assert cache.get(key) is None
+        cache.set(key, {"indicator_id": "E1", "value": 2875.0, "confidence": 0.9})
+        assert cache.get(key)["value"] == 2875.0
+    
+    def test_key_depends_on_prompt(self):
+        """Test different contexts don't share a cache entry."""
+        key_a = LLMCache.make_key("model", "AIB", "E1", "context A")
+        key_b = LLMCache.make_key("model", "AIB", "E1", "context B")
+        assert key_a != key_b
+
+
+class TestDatabaseHandler:
+    """Tests for DatabaseHandler against an in-memory SQLite database."""
+    
+    def test_summary_stats(self, base_indicator):
+        """Test totals and per-company stats on a non-PostgreSQL backend."""
+        from src.database_handler import DatabaseHandler
+        
+        handler = DatabaseHandler("sqlite://")
+        handler.create_tables()
+        assert handler.get_summary_stats() == {"total_indicators": 0, "by_company": []}
+        
+        handler.save_indicator(base_indicator, "AIB", 2024)
+        handler.save_indicator(base_indicator, "BBVA", 2024)
+        stats = handler.get_summary_stats()
+        
+        assert stats["total_indicators"] == 2
+        assert {c["company"]: c["count"] for c in stats["by_company"]} == {"AIB": 1, "BBVA": 1}
+
+
+@pytest.fixture(scope="module")
+def extract_json_object():
+    """The pipeline's JSON scanner (the module needs the LLM client libraries)."""
+    pytest.importorskip("langchain_google_vertexai")
+    from run_extraction_v3 import extract_json_object
+    return extract_json_object
+
+
+class TestExtractJsonObject:
+    """Tests for pulling the JSON object out of an LLM response."""
+    
+    @pytest.mark.parametrize("text,expected", [
+        # Nested object
+        (
+            'Result: {"indicator_id": "E1", "meta": {"page": 3}, "value": 5}',
+            '{"indicator_id": "E1", "meta": {"page": 3}, "value": 5}',
+        ),
+        # Braces inside a string value
+        (
+            '{"indicator_id": "S1", "notes": "see } and { here"}',
+            '{"indicator_id": "S1", "notes": "see } and { here"}',
+        ),
+        # An earlier object without the required key
+        (
+            '{"step": 1} then {"indicator_id": "E2", "value": 7}',
+            '{"indicator_id": "E2", "value": 7}',
+        ),
+        # Unbalanced brace in the prose before the JSON
+        (
+            'Note {see table 3. Answer: {"indicator_id": "G1", "value": 2}',
+            '{"indicator_id": "G1", "value": 2}',
+        ),
+        # No JSON at all
+        ("No value was found in the context.", None),
+    ])
+    def test_extract(self, extract_json_object, text, expected):
+        """Test the object holding the required key is returned intact."""
+        assert extract_json_object(text, "indicator_id") == expected
+
+
+CSV_HEADER = "company,report_year,indicator_id,indicator_name,value,unit,confidence_score,source_page,notes\n"
+
+
+@pytest.fixture
+def stats_client(tmp_path, monkeypatch):
+    """A TestClient for the dashboard, reading its CSV from tmp_path."""
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    import app
+    
+    csv_path = tmp_path / "extracted_indicators_v3.csv"
+    monkeypatch.setattr(app, "CSV_PATH", csv_path)
+    monkeypatch.setitem(app._stats_cache, "mtime", None)
+    return TestClient(app.app), csv_path
+
+
+class TestStatsEndpoint:
+    """Tests for /api/stats, which summarises the exported CSV."""
+    
+    def test_counts_from_csv_columns(self, stats_client):
+        """Test counts come from the company / confidence_score columns."""
+        client, csv_path = stats_client
+        csv_path.write_text(
+            CSV_HEADER
+            + "AIB,2024,E1,Scope 1,100,tCO2e,0.85,12,\n"
+            + "AIB,2024,E2,Scope 2,,tCO2e,0.0,,Not found\n"
+            + "BBVA,2024,S1,Total Employees,5,FTE,0.6,3,\n",
+            encoding="utf-8",
+        )
+        
+        stats = client.get("/api/stats").json()
+        banks = {b["name"]: b for b in stats["banks"]}
+        
+        assert stats["total_found"] == 2
+        assert stats["high_conf"] == 1
+        assert banks["AIB"]["found"] == 1
+        assert banks["AIB"]["high_conf"] == 1
+        assert banks["BBVA"]["found"] == 1
+        assert banks["BBVA"]["high_conf"] == 0
+        assert banks["BPCE"]["found"] == 0
+    
+    def test_header_only_csv(self, stats_client):
+        """Test an export with no rows yet reports zeros instead of an error."""
+        client, csv_path = stats_client
+        csv_path.write_text(CSV_HEADER, encoding="utf-8")
+        
+        stats = client.get("/api/stats").json()
+        
+        assert "error" not in stats
+        assert stats["total_found"] == 0
+        assert [b["found"] for b in stats["banks"]] == [0, 0, 0]
+
+
+class TestIndicatorValidation:
+    """Tests for indicator validation."""
+    
+    def test_valid_emissions_indicator(self, base_indicator):
+        """Test validation of a valid emissions indicator."""
+        indicator = base_indicator
+        
+        # Should be valid - no negative emissions
+        assert indicator.value >= 0
+    
+    def test_valid_percentage_indicator(self):
+        """Test validation of a percentage indicator."""
+        indicator = CSRDIndicator(
+            indicator_id="E6",
+            indicator_name="Renewable Energy Percentage",
+            value=67,
+            unit="%",
+            confidence_score=0.82,
+            source_page=45,
+        )
+        
+        # Should be valid percentage
+        assert 0 <= indicator.value <= 100
+    
+    def test_null_value_handling(self):
+        """Test that null values are handled correctly."""
+        indicator = CSRDIndicator(
+            indicator_id="G3",
+            indicator_name="Corruption Incidents",
+            value=None,  # Not disclosed
+            unit="count",
+            confidence_score=0.0,
+            notes="Indicator not found in report",
+        )
+        
+        assert indicator.value is None
+        assert indicator.confidence_score == 0.0
+    
+    def test_year_indicator(self):
+        """Test validation of year-type indicator."""
+        indicator = CSRDIndicator(
+            indicator_id="E7",
+            indicator_name="Net Zero Target Year",
+            value=2050,
+            unit="year",
+            confidence_score=0.90,
+            source_page=15,
+        )
+        
+        # Year should be reasonable (2024-2100)
+        assert 2024 <= indicator.value <= 2100
+    
+    def test_negative_pay_gap_allowed(self):
+        """Test that negative pay gap is allowed (women earn more)."""
+        indicator = CSRDIndicator(
+            indicator_id="S3",
+            indicator_name="Gender Pay Gap",
+            value=-5.2,  # Women earn 5.2% more
+            unit="%",
+            confidence_score=0.75,
+            source_page=89,
+        )
+        
+        # Negative pay gap is valid
+        assert -100 <= indicator.value <= 100
+
+
+class TestCrossValidation:
+    """Tests for cross-field validation."""
+    
+    def test_total_employees_sanity(self):
+        """Test total employees sanity check."""
+        indicator = CSRDIndicator(
+            indicator_id="S1",
+            indicator_name="Total Employees",
+            value=10500,
+            unit="FTE",
+            confidence_score=0.95,
+            source_page=28,
+        )
+        
+        # Should be reasonable for a major bank
+        assert 100 < indicator.value < 500000
+    
+    def test_training_hours_sanity(self):
+        """Test training hours sanity check."""
+        indicator = CSRDIndicator(
+            indicator_id="S4",
+            indicator_name="Training Hours per Employee",
+            value=35,
+            unit="hours",
+            confidence_score=0.80,
+            source_page=95,
+        )
+        
+        # Should be reasonable (not more than full work year)
+        assert 0 <= indicator.value <= 500
+    
+    def test_board_meetings_sanity(self):
+        """Test board meetings sanity check."""
+        indicator = CSRDIndicator(
+            indicator_id="G2",
+            indicator_name="Board Meetings per Year",
+            value=12,
+            unit="count",
+            confidence_score=0.92,
+            source_page=45,
+        )
+        
+        # Should be reasonable (monthly or less)
+        assert 0 <= indicator.value <= 52
+
+
+class TestConfidenceScoring:
+    """Tests for confidence score handling."""
+    
+    def test_high_confidence(self):
+        """Test high confidence extraction."""
+        indicator = CSRDIndicator(
+            indicator_id="E1",
+            indicator_name="Scope 1 GHG Emissions",
+            value=15000,
+            unit="tCO₂e",
+            confidence_score=0.95,
+            source_page=42,
+            notes="Clearly stated in emissions table",
+        )
+        
+        assert indicator.confidence_score >= 0.9
+    
+    def test_low_confidence(self):
+        """Test low confidence extraction."""
+        indicator = CSRDIndicator(
+            indicator_id="E3",
+            indicator_name="Scope 3 GHG Emissions",
+            value=125000,
+            unit="tCO₂e",
+            confidence_score=0.55,
+            source_page=67,
+            notes="Value interpreted from narrative text",
+        )
+        
+        assert indicator.confidence_score < 0.6
+    
+    def test_confidence_rounding(self):
+        """Test that confidence is rounded to 3 decimal places."""
+        indicator = CSRDIndicator(
+            indicator_id="E1",
+            indicator_name="Test",
+            value=100,
+            unit="test",
+            confidence_score=0.85555555,
+        )
+        
+        # Should be rounded to 3 decimal places
+        assert indicator.confidence_score == 0.856
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])